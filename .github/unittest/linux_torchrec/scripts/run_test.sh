@@ -19,6 +19,9 @@ export LD_LIBRARY_PATH=$LD_LIBRARY_PATH:$lib_dir
 export MKL_THREADING_LAYER=GNU
 
 coverage run -m pytest test/smoke_test.py -v --durations 20
-coverage run -m pytest --instafail -v --durations 20
+# tests are grouped per (class, td_name) in conftest.py so that class-scoped fixtures
+# are built once per worker; distributed tests bind fixed ports and run serially
+coverage run -m pytest --instafail -v --durations 20 -n auto --dist loadgroup --ignore test/test_distributed.py
+coverage run -m pytest test/test_distributed.py --instafail -v --durations 20
 coverage run -m pytest ./benchmarks --instafail -v --durations 20
 coverage xml -i
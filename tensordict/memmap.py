@@ -59,6 +59,13 @@ def to_numpy(tensor: torch.Tensor | np.ndarray) -> np.ndarray:
         return tensor
 
 
+@functools.lru_cache(maxsize=None)
+def _tensor_dir() -> frozenset[str]:
+    # the attributes of a tensor do not depend on its device or dtype, so there
+    # is no need to build a tensor for every MemmapTensor to list them
+    return frozenset(torch.zeros(0).__dir__())
+
+
 class MemmapTensor:
     """A torch.tensor interface with a np.memmap array.
 
@@ -314,7 +321,7 @@ class MemmapTensor:
         HAS_OWNERSHIP[self.filename] = True
         # HAD_OWNERSHIP[self.filename] = True
 
-        self._tensor_dir = torch.zeros(0, device=device, dtype=dtype).__dir__()
+        self._tensor_dir = _tensor_dir()
         self._save_item(shape)
 
     def _get_memmap_array(self) -> np.memmap:
@@ -233,6 +233,16 @@ class TestTensorDictsBase:
         return TensorDictParams(self.td(device))
 
 
+def _nondegenerate_mask(shape, p, device, generator=None):
+    """Returns a boolean mask with a fraction ``p`` of True values that is neither all-True nor all-False."""
+    n = prod(shape)
+    k = max(1, min(n - 1, int(p * n)))
+    idx = torch.randperm(n, generator=generator, device=device)[:k]
+    mask = torch.zeros(n, dtype=torch.bool, device=device)
+    mask[idx] = True
+    return mask.view(shape)
+
+
 def expand_list(list_of_tensors, *dims):
     n = len(list_of_tensors)
     td = TensorDict({str(i): tensor for i, tensor in enumerate(list_of_tensors)}, [])
@@ -250,3 +260,15 @@ def decompose(td):
                 yield from decompose(v)
             else:
                 yield v
+
+
+def _ptrs(td):
+    return tuple(v.data_ptr() for v in decompose(td))
+
+
+def _same_leaves(td0, td1):
+    # True if every leaf of td0 is stored as the very same object in td1
+    return all(
+        td1.get(key) is value
+        for key, value in td0.items(include_nested=True, leaves_only=True)
+    )
@@ -50,3 +50,34 @@ def measure_duration(request: pytest.FixtureRequest):
         CALL_TIMES[name] = CALL_TIMES[name] + duration
 
     request.addfinalizer(fin)
+
+
+def pytest_configure(config):
+    # registered here too so that the marker is known when pytest-xdist is absent
+    config.addinivalue_line(
+        "markers", "xdist_group(name): run the marked tests on the same xdist worker"
+    )
+    # Under pytest-xdist, each worker gets one of the GPUs listed in
+    # CUDA_VISIBLE_DEVICES (when several are) rather than all of them piling up
+    # on the first one. This must run before CUDA is initialized.
+    worker = os.environ.get("PYTEST_XDIST_WORKER")
+    visible_devices = os.environ.get("CUDA_VISIBLE_DEVICES")
+    if worker is not None and visible_devices:
+        devices = [device for device in visible_devices.split(",") if device.strip()]
+        if len(devices) > 1:
+            worker_idx = int(worker.lstrip("gw"))
+            os.environ["CUDA_VISIBLE_DEVICES"] = devices[worker_idx % len(devices)]
+
+
+def pytest_collection_modifyitems(config, items):
+    # Tests parametrized over td_name are grouped per (class, td_name) such that,
+    # with ``--dist loadgroup``, every flavour of tensordict is handled by a
+    # single worker and its class-scoped fixtures are only built once.
+    for item in items:
+        callspec = getattr(item, "callspec", None)
+        if callspec is None or "td_name" not in callspec.params:
+            continue
+        scope = item.cls.__name__ if item.cls is not None else item.module.__name__
+        item.add_marker(
+            pytest.mark.xdist_group(name=f"{scope}-{callspec.params['td_name']}")
+        )
@@ -16,6 +16,7 @@ from tensordict import MemmapTensor
 from torch import multiprocessing as mp
 
 TIMEOUT = 100
+_DEVICES = tuple(get_available_devices())
 
 
 def test_memmap_type():
@@ -192,7 +193,7 @@ def test_memmap_new(index):
     assert m2c == m1
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_memmap_same_device_as_tensor(device):
     """
     Created MemmapTensor should be on the same device as the input tensor.
@@ -202,7 +203,7 @@ def test_memmap_same_device_as_tensor(device):
     m = MemmapTensor.from_tensor(t)
     assert t.device == torch.device(device)
     assert m.device == torch.device(device)
-    for other_device in get_available_devices():
+    for other_device in _DEVICES:
         if other_device != device:
             with pytest.raises(
                 RuntimeError,
@@ -214,14 +215,14 @@ def test_memmap_same_device_as_tensor(device):
         assert m.device == torch.device(other_device)
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_memmap_create_on_same_device(device):
     """Test if the device arg for MemmapTensor init is respected."""
     m = MemmapTensor([3, 4], device=device)
     assert m.device == torch.device(device)
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 @pytest.mark.parametrize(
     "value", [torch.zeros([3, 4]), MemmapTensor.from_tensor(torch.zeros([3, 4]))]
 )
@@ -516,7 +517,7 @@ def dummy_memmap():
     return MemmapTensor.from_tensor(torch.zeros(10, 11))
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 class TestOps:
     def test_eq(self, device, dummy_memmap):
         dummy_memmap.device = device
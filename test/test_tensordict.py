@@ -4,6 +4,8 @@
 # LICENSE file in the root directory of this source tree.
 
 import argparse
+import functools
+import importlib.util
 import os
 import re
 import uuid
@@ -23,20 +25,24 @@ except ImportError as err:
     _has_torchsnapshot = False
     TORCHSNAPSHOT_ERR = str(err)
 
-try:
-    import h5py  # noqa
-
-    _has_h5py = True
-except ImportError:
-    _has_h5py = False
+_has_h5py = importlib.util.find_spec("h5py") is not None
 
-from _utils_internal import decompose, get_available_devices, prod, TestTensorDictsBase
+from _utils_internal import (
+    _nondegenerate_mask,
+    _ptrs,
+    _same_leaves,
+    decompose,
+    get_available_devices,
+    prod,
+    TestTensorDictsBase,
+)
 from functorch import dim as ftdim
 
 from tensordict import LazyStackedTensorDict, MemmapTensor, TensorDict
 from tensordict.tensordict import (
     _CustomOpTensorDict,
     _stack as stack_td,
+    _stage_cuda_leaves,
     assert_allclose_td,
     dense_stack_tds,
     is_tensor_collection,
@@ -49,8 +55,45 @@ from tensordict.tensordict import (
 from tensordict.utils import _getitem_batch_size, convert_ellipsis_to_idx
 from torch import multiprocessing as mp, nn
 
+_DEVICES = tuple(get_available_devices())
+_DEVICES_NOCPU = _DEVICES[1:]
+
+_ERR_NOT_FOUND = re.compile("not found in TensorDict with keys")
+_ERR_PROHIBITED = re.compile("is prohibited for existing tensors")
+_ERR_DIFF_DEV = re.compile('tensors on different devices at key "sub" / "a"')
+_ERR_LOCKED = re.compile("locked")
+_ERR_BATCHSIZE = re.compile("Cannot pass batch-size to a ")
+_ERR_BOOL = re.compile("Converting a tensordict to boolean value is not permitted")
+_ERR_MODIFY_LOCKED = re.compile(
+    "Cannot modify locked TensorDict. For in-place modification"
+)
+_ERR_LOCK = re.compile(re.escape(TensorDictBase.LOCK_ERROR))
+_ERR_LAZY_BATCH_SIZE = re.compile(
+    re.escape(
+        "modifying the batch size of a lazy repesentation of a tensordict is not "
+        "permitted. Consider instantiating the tensordict first by calling "
+        "`td = td.to_tensordict()` before resetting the batch size."
+    )
+)
+_ERR_UNFLATTEN = re.compile(
+    re.escape(
+        "Unflattening key(s) in tensordict will override existing unflattened key"
+    )
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _ellipsis_batch_size(index, batch_size):
+    # resolved once per (index, batch_size) across all the parametrizations
+    return _getitem_batch_size(batch_size, convert_ellipsis_to_idx(index, batch_size))
+
 
-@pytest.mark.parametrize("device", get_available_devices())
+def _is_cuda(device):
+    # cuda leaves always report as shared in the repr
+    return device is not None and device.type == "cuda"
+
+
+@pytest.mark.parametrize("device", _DEVICES)
 def test_tensordict_set(device):
     torch.manual_seed(1)
     td = TensorDict({}, batch_size=(4, 5), device=device)
@@ -68,7 +111,7 @@ def test_tensordict_set(device):
     td.set("key_device", torch.ones(4, 5, device="cpu", dtype=torch.double))
     assert td.get("key_device").device == torch.device(device)
 
-    with pytest.raises(KeyError, match="not found in TensorDict with keys"):
+    with pytest.raises(KeyError, match=_ERR_NOT_FOUND):
         td.set_("smartypants", torch.ones(4, 5, device="cpu", dtype=torch.double))
     # test set_at_
     td.set("key2", torch.randn(4, 5, 6, device=device))
@@ -91,7 +134,7 @@ def test_tensordict_set(device):
     assert td["key1"].shape == td._tensordict["key1"].shape
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_tensordict_device(device):
     tensordict = TensorDict({"a": torch.randn(3, 4)}, [])
     assert tensordict.device is None
@@ -127,16 +170,14 @@ def test_tensordict_device(device):
 
 
 @pytest.mark.skipif(torch.cuda.device_count() == 0, reason="No cuda device detected")
-@pytest.mark.parametrize("device", get_available_devices()[1:])
+@pytest.mark.parametrize("device", _DEVICES_NOCPU)
 def test_tensordict_error_messages(device):
     sub1 = TensorDict({"a": torch.randn(2, 3)}, [2])
     sub2 = TensorDict({"a": torch.randn(2, 3, device=device)}, [2])
     td1 = TensorDict({"sub": sub1}, [2])
     td2 = TensorDict({"sub": sub2}, [2])
 
-    with pytest.raises(
-        RuntimeError, match='tensors on different devices at key "sub" / "a"'
-    ):
+    with pytest.raises(RuntimeError, match=_ERR_DIFF_DEV):
         torch.cat([td1, td2], 0)
 
 
@@ -160,8 +201,12 @@ def test_pad():
     assert torch.equal(padded_td["a"], expected_a)
     padded_td._check_batch_size()
 
+    # tuples are accepted too
+    padded_td_tuple = pad(td, (dim0_left, dim0_right, dim1_left, dim1_right))
+    assert_allclose_td(padded_td, padded_td_tuple)
+
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_tensordict_indexing(device):
     torch.manual_seed(1)
     td = TensorDict({}, batch_size=(4, 5))
@@ -178,15 +223,11 @@ def test_tensordict_indexing(device):
     td_select._check_batch_size()
 
     td_reconstruct = stack_td(list(td), 0, contiguous=False)
-    assert (
-        td_reconstruct == td
-    ).all(), f"td and td_reconstruct differ, got {td} and {td_reconstruct}"
+    assert_allclose_td(td_reconstruct, td)
 
     superlist = [stack_td(list(_td), 0, contiguous=False) for _td in td]
     td_reconstruct = stack_td(superlist, 0, contiguous=False)
-    assert (
-        td_reconstruct == td
-    ).all(), f"td and td_reconstruct differ, got {td == td_reconstruct}"
+    assert_allclose_td(td_reconstruct, td)
 
     x = torch.randn(4, 5, device=device)
     td = TensorDict(
@@ -203,7 +244,7 @@ def test_tensordict_indexing(device):
     torch.testing.assert_close(td.get("key1")[:, 0], td[:, 0].get("key1"))
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_subtensordict_construction(device):
     torch.manual_seed(1)
     td = TensorDict({}, batch_size=(4, 5))
@@ -221,9 +262,9 @@ def test_subtensordict_construction(device):
     assert (std_control.get("key2") == std2.get("key2")).all()
 
     # write values
-    with pytest.raises(RuntimeError, match="is prohibited for existing tensors"):
+    with pytest.raises(RuntimeError, match=_ERR_PROHIBITED):
         std_control.set("key1", torch.randn(1, device=device))
-    with pytest.raises(RuntimeError, match="is prohibited for existing tensors"):
+    with pytest.raises(RuntimeError, match=_ERR_PROHIBITED):
         std_control.set("key2", torch.randn(6, device=device, dtype=torch.double))
 
     subval1 = torch.randn(1, device=device)
@@ -248,26 +289,25 @@ def test_subtensordict_construction(device):
     )
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_mask_td(device):
     torch.manual_seed(1)
     d = {
-        "key1": torch.randn(4, 5, 6, device=device),
-        "key2": torch.randn(4, 5, 10, device=device),
+        "key1": torch.empty(4, 5, 6, device=device),
+        "key2": torch.empty(4, 5, 10, device=device),
     }
-    mask = torch.zeros(4, 5, dtype=torch.bool, device=device).bernoulli_()
+    mask = _nondegenerate_mask((4, 5), 0.5, device)
     td = TensorDict(batch_size=(4, 5), source=d)
 
     td_masked = torch.masked_select(td, mask)
     assert len(td_masked.get("key1")) == td_masked.shape[0]
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_unbind_td(device):
-    torch.manual_seed(1)
     d = {
-        "key1": torch.randn(4, 5, 6, device=device),
-        "key2": torch.randn(4, 5, 10, device=device),
+        "key1": torch.empty(4, 5, 6, device=device),
+        "key2": torch.empty(4, 5, 10, device=device),
     }
     td = TensorDict(batch_size=(4, 5), source=d)
     td_unbind = torch.unbind(td, dim=1)
@@ -276,19 +316,18 @@ def test_unbind_td(device):
     ), f"got {td_unbind[0].batch_size} and {td[:, 0].batch_size}"
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_cat_td(device):
-    torch.manual_seed(1)
     d = {
-        "key1": torch.randn(4, 5, 6, device=device),
-        "key2": torch.randn(4, 5, 10, device=device),
-        "key3": {"key4": torch.randn(4, 5, 10, device=device)},
+        "key1": torch.ones(4, 5, 6, device=device),
+        "key2": torch.ones(4, 5, 10, device=device),
+        "key3": {"key4": torch.ones(4, 5, 10, device=device)},
     }
     td1 = TensorDict(batch_size=(4, 5), source=d, device=device)
     d = {
-        "key1": torch.randn(4, 10, 6, device=device),
-        "key2": torch.randn(4, 10, 10, device=device),
-        "key3": {"key4": torch.randn(4, 10, 10, device=device)},
+        "key1": torch.ones(4, 10, 6, device=device),
+        "key2": torch.ones(4, 10, 10, device=device),
+        "key3": {"key4": torch.ones(4, 10, 10, device=device)},
     }
     td2 = TensorDict(batch_size=(4, 10), source=d, device=device)
 
@@ -300,22 +339,20 @@ def test_cat_td(device):
         "key3": {"key4": torch.zeros(4, 15, 10, device=device)},
     }
     td_out = TensorDict(batch_size=(4, 15), source=d, device=device)
-    data_ptr_set_before = {val.data_ptr() for val in decompose(td_out)}
+    data_ptrs_before = _ptrs(td_out)
     torch.cat([td1, td2], 1, out=td_out)
-    data_ptr_set_after = {val.data_ptr() for val in decompose(td_out)}
-    assert data_ptr_set_before == data_ptr_set_after
+    assert data_ptrs_before == _ptrs(td_out)
     assert td_out.batch_size == torch.Size([4, 15])
     assert (td_out["key1"] != 0).all()
     assert (td_out["key2"] != 0).all()
     assert (td_out["key3", "key4"] != 0).all()
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_expand(device):
-    torch.manual_seed(1)
     d = {
-        "key1": torch.randn(4, 5, 6, device=device),
-        "key2": torch.randn(4, 5, 10, device=device),
+        "key1": torch.empty(4, 5, 6, device=device),
+        "key2": torch.empty(4, 5, 10, device=device),
     }
     td1 = TensorDict(batch_size=(4, 5), source=d)
     td2 = td1.expand(3, 7, 4, 5)
@@ -324,12 +361,11 @@ def test_expand(device):
     assert td2.get("key2").shape == torch.Size([3, 7, 4, 5, 10])
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_expand_with_singleton(device):
-    torch.manual_seed(1)
     d = {
-        "key1": torch.randn(1, 5, 6, device=device),
-        "key2": torch.randn(1, 5, 10, device=device),
+        "key1": torch.empty(1, 5, 6, device=device),
+        "key2": torch.empty(1, 5, 10, device=device),
     }
     td1 = TensorDict(batch_size=(1, 5), source=d)
     td2 = td1.expand(3, 7, 4, 5)
@@ -338,12 +374,11 @@ def test_expand_with_singleton(device):
     assert td2.get("key2").shape == torch.Size([3, 7, 4, 5, 10])
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_squeeze(device):
-    torch.manual_seed(1)
     d = {
-        "key1": torch.randn(4, 5, 6, device=device),
-        "key2": torch.randn(4, 5, 10, device=device),
+        "key1": torch.empty(4, 5, 6, device=device),
+        "key2": torch.empty(4, 5, 10, device=device),
     }
     td1 = TensorDict(batch_size=(4, 5), source=d)
     td2 = torch.unsqueeze(td1, dim=1)
@@ -353,13 +388,12 @@ def test_squeeze(device):
     assert td1b.batch_size == td1.batch_size
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_permute(device):
-    torch.manual_seed(1)
     d = {
-        "a": torch.randn(4, 5, 6, 9, device=device),
-        "b": torch.randn(4, 5, 6, 7, device=device),
-        "c": torch.randn(4, 5, 6, device=device),
+        "a": torch.empty(4, 5, 6, 9, device=device),
+        "b": torch.empty(4, 5, 6, 7, device=device),
+        "c": torch.empty(4, 5, 6, device=device),
     }
     td1 = TensorDict(batch_size=(4, 5, 6), source=d)
     td2 = torch.permute(td1, dims=(2, 1, 0))
@@ -373,21 +407,20 @@ def test_permute(device):
     td2 = torch.permute(td1, dims=(0, 1, 2))
     assert td2["a"].shape == torch.Size((4, 5, 6, 9))
 
-    t = TensorDict({"a": torch.randn(3, 4, 1)}, [3, 4])
-    torch.permute(t, dims=(1, 0)).set("b", torch.randn(4, 3))
+    t = TensorDict({"a": torch.empty(3, 4, 1)}, [3, 4])
+    torch.permute(t, dims=(1, 0)).set("b", torch.empty(4, 3))
     assert t["b"].shape == torch.Size((3, 4))
 
     torch.permute(t, dims=(1, 0)).fill_("a", 0.0)
     assert torch.sum(t["a"]) == torch.Tensor([0])
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_permute_applied_twice(device):
-    torch.manual_seed(1)
     d = {
-        "a": torch.randn(4, 5, 6, 9, device=device),
-        "b": torch.randn(4, 5, 6, 7, device=device),
-        "c": torch.randn(4, 5, 6, device=device),
+        "a": torch.empty(4, 5, 6, 9, device=device),
+        "b": torch.empty(4, 5, 6, 7, device=device),
+        "c": torch.empty(4, 5, 6, device=device),
     }
     td1 = TensorDict(batch_size=(4, 5, 6), source=d)
     td2 = torch.permute(td1, dims=(2, 1, 0))
@@ -399,55 +432,46 @@ def test_permute_applied_twice(device):
     assert td3 is not td1
 
 
-@pytest.mark.parametrize("device", get_available_devices())
-def test_permute_exceptions(device):
-    torch.manual_seed(1)
+@pytest.fixture(scope="module")
+def permute_exceptions_td(device):
     d = {
-        "a": torch.randn(4, 5, 6, 7, device=device),
-        "b": torch.randn(4, 5, 6, 8, 9, device=device),
+        "a": torch.empty(4, 5, 6, 7, device=device),
+        "b": torch.empty(4, 5, 6, 8, 9, device=device),
     }
-    td1 = TensorDict(batch_size=(4, 5, 6), source=d)
+    return TensorDict(batch_size=(4, 5, 6), source=d)
 
-    with pytest.raises(RuntimeError):
-        td2 = td1.permute(1, 1, 0)
-        _ = td2.shape
-
-    with pytest.raises(RuntimeError):
-        td2 = td1.permute(3, 2, 1, 0)
-        _ = td2.shape
-
-    with pytest.raises(RuntimeError):
-        td2 = td1.permute(2, -1, 0)
-        _ = td2.shape
-
-    with pytest.raises(IndexError):
-        td2 = td1.permute(2, 3, 0)
-        _ = td2.shape
-
-    with pytest.raises(IndexError):
-        td2 = td1.permute(2, -4, 0)
-        _ = td2.shape
 
-    with pytest.raises(RuntimeError):
-        td2 = td1.permute(2, 1)
-        _ = td2.shape
+@pytest.mark.parametrize(
+    "dims,error",
+    [
+        ((1, 1, 0), RuntimeError),
+        ((3, 2, 1, 0), RuntimeError),
+        ((2, -1, 0), RuntimeError),
+        ((2, 3, 0), IndexError),
+        ((2, -4, 0), IndexError),
+        ((2, 1), RuntimeError),
+    ],
+)
+@pytest.mark.parametrize("device", _DEVICES, scope="module")
+def test_permute_exceptions(permute_exceptions_td, device, dims, error):
+    with pytest.raises(error):
+        _ = permute_exceptions_td.permute(*dims).shape
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_permute_with_tensordict_operations(device):
-    torch.manual_seed(1)
     d = {
-        "a": torch.randn(20, 6, 9, device=device),
-        "b": torch.randn(20, 6, 7, device=device),
-        "c": torch.randn(20, 6, device=device),
+        "a": torch.empty(20, 6, 9, device=device),
+        "b": torch.empty(20, 6, 7, device=device),
+        "c": torch.empty(20, 6, device=device),
     }
     td1 = TensorDict(batch_size=(20, 6), source=d).view(4, 5, 6).permute(2, 1, 0)
     assert td1.shape == torch.Size((6, 5, 4))
 
     d = {
-        "a": torch.randn(4, 5, 6, 7, 9, device=device),
-        "b": torch.randn(4, 5, 6, 7, 7, device=device),
-        "c": torch.randn(4, 5, 6, 7, device=device),
+        "a": torch.empty(4, 5, 6, 7, 9, device=device),
+        "b": torch.empty(4, 5, 6, 7, 7, device=device),
+        "c": torch.empty(4, 5, 6, 7, device=device),
     }
     td1 = TensorDict(batch_size=(4, 5, 6, 7), source=d)[
         :, :, :, torch.tensor([1, 2])
@@ -455,9 +479,9 @@ def test_permute_with_tensordict_operations(device):
     assert td1.shape == torch.Size((2, 6, 5, 4))
 
     d = {
-        "a": torch.randn(4, 5, 9, device=device),
-        "b": torch.randn(4, 5, 7, device=device),
-        "c": torch.randn(4, 5, device=device),
+        "a": torch.empty(4, 5, 9, device=device),
+        "b": torch.empty(4, 5, 7, device=device),
+        "c": torch.empty(4, 5, device=device),
     }
     td1 = stack_td(
         [TensorDict(batch_size=(4, 5), source=d).clone() for _ in range(6)],
@@ -491,7 +515,6 @@ def test_inferred_view_size():
     ],
 )
 def test_convert_ellipsis_to_idx_valid(ellipsis_index, expected_index):
-    torch.manual_seed(1)
     batch_size = [3, 4, 5, 6, 7]
 
     assert convert_ellipsis_to_idx(ellipsis_index, batch_size) == expected_index
@@ -505,7 +528,6 @@ def test_convert_ellipsis_to_idx_valid(ellipsis_index, expected_index):
     ],
 )
 def test_convert_ellipsis_to_idx_invalid(ellipsis_index, expectation):
-    torch.manual_seed(1)
     batch_size = [3, 4, 5, 6, 7]
 
     with expectation:
@@ -536,21 +558,37 @@ TD_BATCH_SIZE = 4
             "td_h5", marks=pytest.mark.skipif(not _has_h5py, reason="h5py not found.")
         ),
     ],
+    scope="class",
 )
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES, scope="class")
 class TestTensorDicts(TestTensorDictsBase):
-    def test_permute_applied_twice(self, td_name, device):
+    @pytest.fixture(scope="class")
+    def td_reference(self, td_name, device):
+        """A tensordict built once per (td_name, device) pair.
+
+        Only tests that do not modify the tensordict in any way should use
+        this fixture. Tests that write, lock or reshape the content must build
+        their own instance with ``getattr(self, td_name)(device)``.
+        """
+        # class-scoped fixtures are built before the autouse _seed runs
+        torch.manual_seed(1)
+        return getattr(self, td_name)(device)
+
+    @pytest.fixture(autouse=True)
+    def _seed(self):
+        torch.manual_seed(1)
+        yield
+
+    def test_permute_applied_twice(self, td_name, device, td_reference):
         torch.manual_seed(0)
-        tensordict = getattr(self, td_name)(device)
-        for _ in range(10):
-            p = torch.randperm(4)
-            inv_p = p.argsort()
-            other_p = inv_p
-            while (other_p == inv_p).all():
-                other_p = torch.randperm(4)
-            other_p = tuple(other_p.tolist())
-            p = tuple(p.tolist())
-            inv_p = tuple(inv_p.tolist())
+        tensordict = td_reference
+        perms = torch.stack([torch.randperm(4) for _ in range(10)])
+        inv_perms = perms.argsort(dim=-1)
+        for p, inv_p in zip(perms.tolist(), inv_perms.tolist()):
+            p = tuple(p)
+            inv_p = tuple(inv_p)
+            # reversing 4 distinct dims always yields a different permutation
+            other_p = inv_p[::-1]
             if td_name in ("td_params",):
                 assert (
                     tensordict.permute(*p).permute(*inv_p)._param_td
@@ -574,16 +612,14 @@ class TestTensorDicts(TestTensorDictsBase):
                 assert torch.permute(tensordict, p).permute(inv_p) is tensordict
                 assert torch.permute(tensordict, p).permute(other_p) is not tensordict
 
-    def test_to_tensordict(self, td_name, device):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+    def test_to_tensordict(self, td_name, device, td_reference):
+        td = td_reference
         td2 = td.to_tensordict()
-        assert (td2 == td).all()
+        assert_allclose_td(td2, td)
 
     @pytest.mark.parametrize("strict", [True, False])
     @pytest.mark.parametrize("inplace", [True, False])
     def test_select(self, td_name, device, strict, inplace):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         keys = ["a"]
         if td_name == "td_h5":
@@ -599,23 +635,24 @@ class TestTensorDicts(TestTensorDictsBase):
             assert td2 is td
         else:
             assert td2 is not td
+        # the keys do not depend on the content: a shallow clone is enough
+        td2_clone = td2.clone(recurse=False)
         if td_name == "saved_td":
             assert (len(list(td2.keys())) == len(keys)) and ("a" in td2.keys())
-            assert (len(list(td2.clone().keys())) == len(keys)) and (
-                "a" in td2.clone().keys()
+            assert (len(list(td2_clone.keys())) == len(keys)) and (
+                "a" in td2_clone.keys()
             )
         else:
             assert (len(list(td2.keys(True, True))) == len(keys)) and (
                 "a" in td2.keys()
             )
-            assert (len(list(td2.clone().keys(True, True))) == len(keys)) and (
-                "a" in td2.clone().keys()
+            assert (len(list(td2_clone.keys(True, True))) == len(keys)) and (
+                "a" in td2_clone.keys()
             )
 
     @pytest.mark.parametrize("strict", [True, False])
-    def test_select_exception(self, td_name, device, strict):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+    def test_select_exception(self, td_name, device, strict, td_reference):
+        td = td_reference
         if td_name == "td_h5":
             with pytest.raises(NotImplementedError, match="Cannot call select"):
                 _ = td.select("tada", strict=strict)
@@ -630,7 +667,6 @@ class TestTensorDicts(TestTensorDictsBase):
             assert len(list(td2.keys())) == 0
 
     def test_exclude(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         if td_name == "td_h5":
             with pytest.raises(NotImplementedError, match="Cannot call exclude"):
@@ -641,27 +677,26 @@ class TestTensorDicts(TestTensorDictsBase):
         assert (
             len(list(td2.keys())) == len(list(td.keys())) - 1 and "a" not in td2.keys()
         )
+        td2_clone = td2.clone(recurse=False)
         assert (
-            len(list(td2.clone().keys())) == len(list(td.keys())) - 1
-            and "a" not in td2.clone().keys()
+            len(list(td2_clone.keys())) == len(list(td.keys())) - 1
+            and "a" not in td2_clone.keys()
         )
 
         with td.unlock_():
             td2 = td.exclude("a", inplace=True)
         assert td2 is td
 
-    def test_assert(self, td_name, device):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+    def test_assert(self, td_name, device, td_reference):
+        td = td_reference
         with pytest.raises(
             ValueError,
-            match="Converting a tensordict to boolean value is not permitted",
+            match=_ERR_BOOL,
         ):
             assert td
 
-    def test_expand(self, td_name, device):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+    def test_expand(self, td_name, device, td_reference):
+        td = td_reference
         batch_size = td.batch_size
         expected_size = torch.Size([3, *batch_size])
 
@@ -678,54 +713,41 @@ class TestTensorDicts(TestTensorDictsBase):
         assert all((_new_td == td).all() for _new_td in new_td_iterable)
 
     def test_cast_to(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
+        # example tensor and tensordict shared by the "other" casts below
+        half_example = torch.empty(3, dtype=torch.half, device="cpu:1")
         td_device = td.to("cpu:1")
         assert td_device.device == torch.device("cpu:1")
-        td_dtype = td.to(torch.int)
-        assert all(t.dtype == torch.int for t in td_dtype.values(True, True))
-        del td_dtype
+        td_cast = td.to(torch.int)
+        assert all(t.dtype == torch.int for t in td_cast.values(True, True))
         # device (str), dtype
-        td_dtype_device = td.to("cpu:1", torch.int)
-        assert all(t.dtype == torch.int for t in td_dtype_device.values(True, True))
-        assert td_dtype_device.device == torch.device("cpu:1")
-        del td_dtype_device
+        td_cast = td.to("cpu:1", torch.int)
+        assert all(t.dtype == torch.int for t in td_cast.values(True, True))
+        assert td_cast.device == torch.device("cpu:1")
         # device, dtype
-        td_dtype_device = td.to(torch.device("cpu:1"), torch.int)
-        assert all(t.dtype == torch.int for t in td_dtype_device.values(True, True))
-        assert td_dtype_device.device == torch.device("cpu:1")
-        del td_dtype_device
+        td_cast = td.to(torch.device("cpu:1"), torch.int)
+        assert all(t.dtype == torch.int for t in td_cast.values(True, True))
+        assert td_cast.device == torch.device("cpu:1")
         # example tensor
-        td_dtype_device = td.to(torch.randn(3, dtype=torch.half, device="cpu:1"))
-        assert all(t.dtype == torch.half for t in td_dtype_device.values(True, True))
+        td_cast = td.to(half_example)
+        assert all(t.dtype == torch.half for t in td_cast.values(True, True))
         # tensor on cpu:1 is actually on cpu. This is still meaningful for tensordicts on cuda.
-        assert td_dtype_device.device == torch.device("cpu")
-        del td_dtype_device
+        assert td_cast.device == torch.device("cpu")
         # example td
-        td_dtype_device = td.to(
-            other=TensorDict(
-                {"a": torch.randn(3, dtype=torch.half, device="cpu:1")},
-                [],
-                device="cpu:1",
-            )
-        )
-        assert all(t.dtype == torch.half for t in td_dtype_device.values(True, True))
-        assert td_dtype_device.device == torch.device("cpu:1")
-        del td_dtype_device
+        td_cast = td.to(other=TensorDict({"a": half_example}, [], device="cpu:1"))
+        assert all(t.dtype == torch.half for t in td_cast.values(True, True))
+        assert td_cast.device == torch.device("cpu:1")
         # example td, many dtypes
-        td_nodtype_device = td.to(
+        td_cast = td.to(
             other=TensorDict(
-                {
-                    "a": torch.randn(3, dtype=torch.half, device="cpu:1"),
-                    "b": torch.randint(10, ()),
-                },
+                {"a": half_example, "b": torch.randint(10, ())},
                 [],
                 device="cpu:1",
             )
         )
-        assert all(t.dtype != torch.half for t in td_nodtype_device.values(True, True))
-        assert td_nodtype_device.device == torch.device("cpu:1")
-        del td_nodtype_device
+        assert all(t.dtype != torch.half for t in td_cast.values(True, True))
+        assert td_cast.device == torch.device("cpu:1")
+        del td_cast
         # batch-size: check errors (or not)
         if td_name in (
             "stacked_td",
@@ -734,18 +756,14 @@ class TestTensorDicts(TestTensorDictsBase):
             "permute_td",
             "nested_stacked_td",
         ):
-            with pytest.raises(TypeError, match="Cannot pass batch-size to a "):
-                td_dtype_device = td.to(
-                    torch.device("cpu:1"), torch.int, batch_size=torch.Size([])
-                )
+            with pytest.raises(TypeError, match=_ERR_BATCHSIZE):
+                td.to(torch.device("cpu:1"), torch.int, batch_size=torch.Size([]))
         else:
-            td_dtype_device = td.to(
-                torch.device("cpu:1"), torch.int, batch_size=torch.Size([])
-            )
-            assert all(t.dtype == torch.int for t in td_dtype_device.values(True, True))
-            assert td_dtype_device.device == torch.device("cpu:1")
-            assert td_dtype_device.batch_size == torch.Size([])
-            del td_dtype_device
+            td_cast = td.to(torch.device("cpu:1"), torch.int, batch_size=torch.Size([]))
+            assert all(t.dtype == torch.int for t in td_cast.values(True, True))
+            assert td_cast.device == torch.device("cpu:1")
+            assert td_cast.batch_size == torch.Size([])
+            del td_cast
         if td_name in (
             "stacked_td",
             "unsqueezed_td",
@@ -753,7 +771,7 @@ class TestTensorDicts(TestTensorDictsBase):
             "permute_td",
             "nested_stacked_td",
         ):
-            with pytest.raises(TypeError, match="Cannot pass batch-size to a "):
+            with pytest.raises(TypeError, match=_ERR_BATCHSIZE):
                 td.to(batch_size=torch.Size([]))
         else:
             td_batchsize = td.to(batch_size=torch.Size([]))
@@ -768,7 +786,6 @@ class TestTensorDicts(TestTensorDictsBase):
     #     assert (td == td_td).all()
 
     def test_broadcast(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         sub_td = td[:, :2].to_tensordict()
         sub_td.zero_()
@@ -782,7 +799,6 @@ class TestTensorDicts(TestTensorDictsBase):
 
     @pytest.mark.parametrize("call_del", [True, False])
     def test_remove(self, td_name, device, call_del):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         with td.unlock_():
             if call_del:
@@ -794,16 +810,15 @@ class TestTensorDicts(TestTensorDictsBase):
         if td_name in ("sub_td", "sub_td2"):
             return
         td.lock_()
-        with pytest.raises(RuntimeError, match="locked"):
+        with pytest.raises(RuntimeError, match=_ERR_LOCKED):
             del td["b"]
 
     def test_set_unexisting(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         if td.is_locked:
             with pytest.raises(
                 RuntimeError,
-                match="Cannot modify locked TensorDict. For in-place modification",
+                match=_ERR_MODIFY_LOCKED,
             ):
                 td.set("z", torch.ones_like(td.get("a")))
         else:
@@ -811,7 +826,6 @@ class TestTensorDicts(TestTensorDictsBase):
             assert (td.get("z") == 1).all()
 
     def test_fill_(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         if td_name == "td_params":
             td_set = td.data
@@ -821,30 +835,29 @@ class TestTensorDicts(TestTensorDictsBase):
         assert (td.get("a") == 0.1).all()
         assert new_td is td_set
 
-    def test_shape(self, td_name, device):
-        td = getattr(self, td_name)(device)
+    def test_shape(self, td_name, device, td_reference):
+        td = td_reference
         assert td.shape == td.batch_size
 
-    def test_flatten_unflatten(self, td_name, device):
-        td = getattr(self, td_name)(device)
+    def test_flatten_unflatten(self, td_name, device, td_reference):
+        td = td_reference
         shape = td.shape[:3]
         td_flat = td.flatten(0, 2)
         td_unflat = td_flat.unflatten(0, shape)
-        assert (td.to_tensordict() == td_unflat).all()
+        assert_allclose_td(td.to_tensordict(), td_unflat)
         assert td.batch_size == td_unflat.batch_size
 
-    def test_flatten_unflatten_bis(self, td_name, device):
-        td = getattr(self, td_name)(device)
+    def test_flatten_unflatten_bis(self, td_name, device, td_reference):
+        td = td_reference
         shape = td.shape[1:4]
         td_flat = td.flatten(1, 3)
         td_unflat = td_flat.unflatten(1, shape)
-        assert (td.to_tensordict() == td_unflat).all()
+        assert_allclose_td(td.to_tensordict(), td_unflat)
         assert td.batch_size == td_unflat.batch_size
 
     def test_masked_fill_(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
-        mask = torch.zeros(td.shape, dtype=torch.bool, device=device).bernoulli_()
+        mask = _nondegenerate_mask(td.shape, 0.5, device)
         if td_name == "td_params":
             td_set = td.data
         else:
@@ -873,17 +886,17 @@ class TestTensorDicts(TestTensorDictsBase):
             return
         td.is_locked = not is_locked
         assert td.is_locked != is_locked
-        for _, item in td.items():
+        for item in td.values():
             if isinstance(item, TensorDictBase):
                 assert item.is_locked != is_locked
         td.lock_()
         assert td.is_locked
-        for _, item in td.items():
+        for item in td.values():
             if isinstance(item, TensorDictBase):
                 assert item.is_locked
         td.unlock_()
         assert not td.is_locked
-        for _, item in td.items():
+        for item in td.values():
             if isinstance(item, TensorDictBase):
                 assert not item.is_locked
 
@@ -924,7 +937,6 @@ class TestTensorDicts(TestTensorDictsBase):
             td_set.set_(key, item)
 
     def test_unlock(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         td.unlock_()
         assert not td.is_locked
@@ -941,7 +953,7 @@ class TestTensorDicts(TestTensorDictsBase):
                 td.unlock_()
         else:
             td.unlock_()
-        td.set(("some", "nested"), torch.zeros(td.shape))
+        td.set(("some", "nested"), torch.empty(td.shape, device=td.device))
         if td_name in ("sub_td", "sub_td2") and not td.is_locked:
             with pytest.raises(RuntimeError, match="Cannot lock"):
                 td.lock_()
@@ -957,7 +969,6 @@ class TestTensorDicts(TestTensorDictsBase):
     # @pytest.mark.parametrize("op", ["keys_root", "keys_nested", "values", "items"])
     @pytest.mark.parametrize("op", ["flatten", "unflatten"])
     def test_cache(self, td_name, device, op):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         try:
             td.lock_()
@@ -998,7 +1009,6 @@ class TestTensorDicts(TestTensorDictsBase):
                 assert td._cache is None
 
     def test_enter_exit(self, td_name, device):
-        torch.manual_seed(1)
         if td_name in ("sub_td", "sub_td2"):
             return
         td = getattr(self, td_name)(device)
@@ -1013,7 +1023,6 @@ class TestTensorDicts(TestTensorDictsBase):
         assert td.is_locked is is_locked
 
     def test_lock_change_names(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         try:
             td.names = [str(i) for i in range(td.ndim)]
@@ -1029,15 +1038,16 @@ class TestTensorDicts(TestTensorDictsBase):
             assert val.names[: td.ndim] == [str(-i) for i in range(td.ndim)]
 
     def test_sorted_keys(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         sorted_keys = td.sorted_keys
         i = -1
         for i, (key1, key2) in enumerate(zip(sorted_keys, td.keys())):  # noqa: B007
             assert key1 == key2
         assert i == len(td.keys()) - 1
+        assert isinstance(sorted_keys, tuple)
         if td.is_locked:
             assert td._cache.get("sorted_keys", None) is not None
+            assert td.sorted_keys is sorted_keys
             td.unlock_()
             assert td._cache is None
         elif td_name not in ("sub_td", "sub_td2"):  # we cannot lock sub tensordicts
@@ -1047,22 +1057,21 @@ class TestTensorDicts(TestTensorDictsBase):
                 target = td
             assert target._cache is None
             td.lock_()
-            _ = td.sorted_keys
+            sorted_keys = td.sorted_keys
             assert target._cache.get("sorted_keys", None) is not None
+            assert td.sorted_keys is sorted_keys
             td.unlock_()
             assert target._cache is None
 
-    def test_masked_fill(self, td_name, device):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
-        mask = torch.zeros(td.shape, dtype=torch.bool, device=device).bernoulli_()
+    def test_masked_fill(self, td_name, device, td_reference):
+        td = td_reference
+        mask = _nondegenerate_mask(td.shape, 0.5, device)
         new_td = td.masked_fill(mask, -10.0)
         assert new_td is not td
         for item in new_td.values():
             assert (item[mask] == -10).all()
 
     def test_zero_(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         if td_name == "td_params":
             with pytest.raises(
@@ -1078,7 +1087,8 @@ class TestTensorDicts(TestTensorDictsBase):
     @pytest.mark.parametrize("inplace", [False, True])
     def test_apply(self, td_name, device, inplace):
         td = getattr(self, td_name)(device)
-        td_c = td.to_tensordict()
+        # a copy of the original values is only needed if td is modified
+        td_c = td.to_tensordict() if inplace else td
         if inplace and td_name == "td_params":
             with pytest.raises(ValueError, match="Failed to update"):
                 td.apply(lambda x: x + 1, inplace=inplace)
@@ -1112,7 +1122,6 @@ class TestTensorDicts(TestTensorDictsBase):
                 assert (td_1[key] == td[key] * 2).all()
 
     def test_from_empty(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         new_td = TensorDict({}, batch_size=td.batch_size, device=device)
         for key, item in td.items():
@@ -1121,15 +1130,10 @@ class TestTensorDicts(TestTensorDictsBase):
         assert td.device == new_td.device
         assert td.shape == new_td.shape
 
-    def test_masking(self, td_name, device):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
-        while True:
-            mask = torch.zeros(
-                td.batch_size, dtype=torch.bool, device=device
-            ).bernoulli_(0.8)
-            if not mask.all() and mask.any():
-                break
+    def test_masking(self, td_name, device, td_reference):
+        td = td_reference
+        generator = torch.Generator(device=device).manual_seed(1)
+        mask = _nondegenerate_mask(td.batch_size, 0.8, device, generator=generator)
         td_masked = td[mask]
         td_masked2 = torch.masked_select(td, mask)
         assert_allclose_td(td_masked, td_masked2)
@@ -1142,20 +1146,30 @@ class TestTensorDicts(TestTensorDictsBase):
         # assert td_masked3.batch_size[0] == mask.sum()
         # assert td_masked3.batch_dims == 1
 
-    def test_entry_type(self, td_name, device):
-        td = getattr(self, td_name)(device)
+    def test_entry_type(self, td_name, device, td_reference):
+        td = td_reference
         for key in td.keys(include_nested=True):
             assert type(td.get(key)) is td.entry_class(key)
 
-    def test_equal(self, td_name, device):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
-        assert (td == td.to_tensordict()).all()
+    def test_equal(self, td_name, device, td_reference):
+        td = td_reference
+        assert td.eq_all(td.to_tensordict())
         td0 = td.to_tensordict().zero_()
         assert (td != td0).any()
+        assert not td.eq_all(td0)
+        assert not td.eq_all(td.to_tensordict().exclude("a"))
+        # a nested tensordict compared with a tensor is a mismatch, not an error
+        for key in td.keys():
+            if is_tensor_collection(td.get(key)):
+                td_tensor = td.to_tensordict().exclude(key)
+                td_tensor.set(key, torch.zeros(td.batch_size))
+                assert not td.eq_all(td_tensor)
+                assert not td_tensor.eq_all(td)
+                td_dict = td.to_tensordict().to_dict()
+                td_dict[key] = torch.zeros(td.batch_size)
+                assert not td.eq_all(td_dict)
 
     def test_equal_float(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         if td_name == "td_params":
             td_set = td.data
@@ -1171,13 +1185,12 @@ class TestTensorDicts(TestTensorDictsBase):
         td_set.zero_()
         assert (td0 != 1.0).all()
 
-    def test_equal_other(self, td_name, device):
-        td = getattr(self, td_name)(device)
+    def test_equal_other(self, td_name, device, td_reference):
+        td = td_reference
         assert not td == "z"
         assert td != "z"
 
     def test_equal_int(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         if td_name == "td_params":
             td_set = td.data
@@ -1189,7 +1202,6 @@ class TestTensorDicts(TestTensorDictsBase):
         assert (td0 != 1).all()
 
     def test_equal_tensor(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         if td_name == "td_params":
             td_set = td.data
@@ -1200,16 +1212,14 @@ class TestTensorDicts(TestTensorDictsBase):
         td0 = td.to_tensordict().zero_()
         assert (td0 != torch.ones([], dtype=torch.int, device=device)).all()
 
-    def test_equal_dict(self, td_name, device):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+    def test_equal_dict(self, td_name, device, td_reference):
+        td = td_reference
         assert (td == td.to_dict()).all()
-        td0 = td.to_tensordict().zero_().to_dict()
+        td0 = torch.zeros_like(td).to_dict()
         assert (td != td0).any()
 
     @pytest.mark.parametrize("dim", [0, 1, 2, 3, -1, -2, -3])
     def test_gather(self, td_name, device, dim):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         index = torch.ones(td.shape, device=td.device, dtype=torch.long)
         other_dim = dim + index.ndim if dim < 0 else dim
@@ -1231,15 +1241,14 @@ class TestTensorDicts(TestTensorDictsBase):
         assert (td_gather2 != 0).any()
 
     def test_where(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
-        mask = torch.zeros(td.shape, dtype=torch.bool, device=device).bernoulli_()
+        mask = _nondegenerate_mask(td.shape, 0.5, device)
         td_where = torch.where(mask, td, 0)
-        for k in td.keys(True, True):
-            assert (td_where.get(k)[~mask] == 0).all()
-        td_where = torch.where(mask, td, torch.ones_like(td))
-        for k in td.keys(True, True):
-            assert (td_where.get(k)[~mask] == 1).all()
+        assert (td_where[~mask] == 0).all()
+        # scalars are covered above, this exercises a tensordict as other
+        td_ones = torch.ones_like(td)
+        td_where = torch.where(mask, td, td_ones)
+        assert (td_where[~mask] == 1).all()
         td_where = td.clone()
 
         if td_name == "td_h5":
@@ -1247,43 +1256,36 @@ class TestTensorDicts(TestTensorDictsBase):
                 RuntimeError,
                 match="Cannot use a persistent tensordict as output of torch.where",
             ):
-                torch.where(mask, td, torch.ones_like(td), out=td_where)
+                torch.where(mask, td, td_ones, out=td_where)
             return
-        torch.where(mask, td, torch.ones_like(td), out=td_where)
-        for k in td.keys(True, True):
-            assert (td_where.get(k)[~mask] == 1).all()
+        torch.where(mask, td, td_ones, out=td_where)
+        assert (td_where[~mask] == 1).all()
 
     def test_where_pad(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         # test with other empty td
-        mask = torch.zeros(td.shape, dtype=torch.bool, device=td.device).bernoulli_()
+        mask = _nondegenerate_mask(td.shape, 0.5, td.device)
         if td_name in ("td_h5",):
             td_full = td.to_tensordict()
         else:
             td_full = td
         td_empty = td_full.empty()
         result = td.where(mask, td_empty, pad=1)
-        for v in result.values(True, True):
-            assert (v[~mask] == 1).all()
-        td_empty = td_full.empty()
+        assert (result[~mask] == 1).all()
+        # td_empty is not modified by where and can be reused
         result = td_empty.where(~mask, td, pad=1)
-        for v in result.values(True, True):
-            assert (v[~mask] == 1).all()
+        assert (result[~mask] == 1).all()
         # with output
         td_out = td_full.empty()
         result = td.where(mask, td_empty, pad=1, out=td_out)
-        for v in result.values(True, True):
-            assert (v[~mask] == 1).all()
+        assert (result[~mask] == 1).all()
         if td_name not in ("td_params",):
             assert result is td_out
         else:
             assert isinstance(result, TensorDictParams)
         td_out = td_full.empty()
-        td_empty = td_full.empty()
         result = td_empty.where(~mask, td, pad=1, out=td_out)
-        for v in result.values(True, True):
-            assert (v[~mask] == 1).all()
+        assert (result[~mask] == 1).all()
         assert result is td_out
 
         with pytest.raises(KeyError, match="not found and no pad value provided"):
@@ -1292,11 +1294,9 @@ class TestTensorDicts(TestTensorDictsBase):
             td_full.empty().where(mask, td)
 
     def test_masking_set(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
-        mask = torch.zeros(td.batch_size, dtype=torch.bool, device=device).bernoulli_(
-            0.8
-        )
+        generator = torch.Generator(device=device).manual_seed(1)
+        mask = _nondegenerate_mask(td.batch_size, 0.8, device, generator=generator)
         n = mask.sum()
         d = td.ndimension()
         pseudo_td = td.apply(
@@ -1320,7 +1320,6 @@ class TestTensorDicts(TestTensorDictsBase):
     )
     @pytest.mark.parametrize("device_cast", [0, "cuda:0", torch.device("cuda:0")])
     def test_pin_memory(self, td_name, device_cast, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         td.unlock_()
         if device.type == "cuda":
@@ -1331,18 +1330,20 @@ class TestTensorDicts(TestTensorDictsBase):
         td_device = td.to(device_cast)
         _device_cast = torch.device(device_cast)
         assert td_device.device == _device_cast
-        assert td_device.clone().device == _device_cast
+        # the clone is only read: one copy is enough for all the device checks
+        td_device_clone = td_device.clone()
+        assert td_device_clone.device == _device_cast
         if device != _device_cast:
             assert td_device is not td
         for item in td_device.values():
             assert item.device == _device_cast
-        for item in td_device.clone().values():
+        for item in td_device_clone.values():
             assert item.device == _device_cast
         # assert type(td_device) is type(td)
         assert_allclose_td(td, td_device.to(device))
 
-    def test_indexed_properties(self, td_name, device):
-        td = getattr(self, td_name)(device)
+    def test_indexed_properties(self, td_name, device, td_reference):
+        td = td_reference
         td_index = td[0]
         assert td_index.is_memmap() is td.is_memmap()
         assert td_index.is_shared() is td.is_shared()
@@ -1365,8 +1366,8 @@ class TestTensorDicts(TestTensorDictsBase):
             ([1], ..., None),
         ],
     )
-    def test_index_none(self, td_name, device, idx):
-        td = getattr(self, td_name)(device)
+    def test_index_none(self, td_name, device, idx, td_reference):
+        td = td_reference
         tdnone = td[idx]
         tensor = torch.zeros(td.shape)
         assert tdnone.shape == tensor[idx].shape, idx
@@ -1380,21 +1381,21 @@ class TestTensorDicts(TestTensorDictsBase):
     @pytest.mark.skipif(
         torch.cuda.device_count() == 0, reason="No cuda device detected"
     )
-    @pytest.mark.parametrize("device_cast", get_available_devices())
-    def test_cast_device(self, td_name, device, device_cast):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+    @pytest.mark.parametrize("device_cast", _DEVICES)
+    def test_cast_device(self, td_name, device, device_cast, td_reference):
+        td = td_reference
         td_device = td.to(device_cast)
 
         for item in td_device.values():
             assert item.device == device_cast
-        for item in td_device.clone().values():
+        td_device_clone = td_device.clone()
+        for item in td_device_clone.values():
             assert item.device == device_cast
 
         assert td_device.device == device_cast, (
             f"td_device first tensor device is " f"{next(td_device.items())[1].device}"
         )
-        assert td_device.clone().device == device_cast
+        assert td_device_clone.device == device_cast
         if device_cast != td.device:
             assert td_device is not td
         assert td_device.to(device_cast) is td_device
@@ -1404,16 +1405,14 @@ class TestTensorDicts(TestTensorDictsBase):
     @pytest.mark.skipif(
         torch.cuda.device_count() == 0, reason="No cuda device detected"
     )
-    def test_cpu_cuda(self, td_name, device):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+    def test_cpu_cuda(self, td_name, device, td_reference):
+        td = td_reference
         td_device = td.cuda()
         td_back = td_device.cpu()
         assert td_device.device == torch.device("cuda")
         assert td_back.device == torch.device("cpu")
 
     def test_state_dict(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         sd = td.state_dict()
         td_zero = td.clone().detach().zero_()
@@ -1421,7 +1420,6 @@ class TestTensorDicts(TestTensorDictsBase):
         assert_allclose_td(td, td_zero)
 
     def test_state_dict_strict(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         sd = td.state_dict()
         td_zero = td.clone().detach().zero_()
@@ -1431,7 +1429,6 @@ class TestTensorDicts(TestTensorDictsBase):
             td_zero.load_state_dict(sd, strict=True)
 
     def test_state_dict_assign(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         sd = td.state_dict()
         td_zero = td.clone().detach().zero_()
@@ -1441,10 +1438,9 @@ class TestTensorDicts(TestTensorDictsBase):
         assert_allclose_td(td, td_zero)
 
     @pytest.mark.parametrize("dim", range(4))
-    def test_unbind(self, td_name, device, dim):
+    def test_unbind(self, td_name, device, dim, td_reference):
         if td_name not in ["sub_td", "idx_td", "td_reset_bs"]:
-            torch.manual_seed(1)
-            td = getattr(self, td_name)(device)
+            td = td_reference
             td_unbind = torch.unbind(td, dim=dim)
             assert (td == stack_td(td_unbind, dim).contiguous()).all()
             idx = (slice(None),) * dim + (0,)
@@ -1452,7 +1448,6 @@ class TestTensorDicts(TestTensorDictsBase):
 
     @pytest.mark.parametrize("squeeze_dim", [0, 1])
     def test_unsqueeze(self, td_name, device, squeeze_dim):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         td.unlock_()  # make sure that the td is not locked
         td_unsqueeze = torch.unsqueeze(td, dim=squeeze_dim)
@@ -1469,7 +1464,6 @@ class TestTensorDicts(TestTensorDictsBase):
         assert (td.get("a") == 1).all()
 
     def test_squeeze(self, td_name, device, squeeze_dim=-1):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         td.unlock_()  # make sure that the td is not locked
         td_squeeze = torch.squeeze(td, dim=-1)
@@ -1490,7 +1484,6 @@ class TestTensorDicts(TestTensorDictsBase):
         assert (td.get("a") == 1).all()
 
     def test_squeeze_with_none(self, td_name, device, squeeze_dim=None):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         td_squeeze = torch.squeeze(td, dim=None)
         tensor = torch.ones_like(td.get("a").squeeze())
@@ -1506,10 +1499,10 @@ class TestTensorDicts(TestTensorDictsBase):
         assert (td.get("a") == 1).all()
 
     @pytest.mark.parametrize("nested", [True, False])
-    def test_exclude_missing(self, td_name, device, nested):
+    def test_exclude_missing(self, td_name, device, nested, td_reference):
         if td_name == "td_h5":
             raise pytest.skip("exclude not implemented for PersitentTensorDict")
-        td = getattr(self, td_name)(device)
+        td = td_reference
         if nested:
             td2 = td.exclude("this key is missing", ("this one too",))
         else:
@@ -1558,10 +1551,13 @@ class TestTensorDicts(TestTensorDictsBase):
         td = getattr(self, td_name)(device)
         td.unlock_()  # make sure that the td is not locked
         keys = set(td.keys())
-        td.update({"x": torch.zeros(td.shape)}, clone=clone)
-        assert set(td.keys()) == keys.union({"x"})
-        # now with nested: using tuples for keys
-        td.update({("somenested", "z"): torch.zeros(td.shape)})
+        # a plain key and a new nested key (using tuples for keys) in one call
+        td.update(
+            {"x": torch.zeros(td.shape), ("somenested", "z"): torch.zeros(td.shape)},
+            clone=clone,
+        )
+        keys.update({"x", "somenested"})
+        assert set(td.keys()) == keys
         assert td["somenested"].shape == td.shape
         assert td["somenested", "z"].shape == td.shape
         td.update({("somenested", "zz"): torch.zeros(td.shape)})
@@ -1572,7 +1568,7 @@ class TestTensorDicts(TestTensorDictsBase):
         keys = set(td.keys(True))
         assert ("newnested", "z") in keys
         td.update({"newnested": {"y": torch.zeros(td.shape)}}, clone=clone)
-        keys = keys.union({("newnested", "y")})
+        keys.add(("newnested", "y"))
         assert keys == set(td.keys(True))
         td.update(
             {
@@ -1581,14 +1577,10 @@ class TestTensorDicts(TestTensorDictsBase):
             },
             clone=clone,
         )
-        keys = keys.union({("newnested", "x"), ("newnested", "w")})
+        keys.update({("newnested", "x"), ("newnested", "w")})
         assert keys == set(td.keys(True))
         td.update({("newnested",): {"v": torch.zeros(td.shape)}}, clone=clone)
-        keys = keys.union(
-            {
-                ("newnested", "v"),
-            }
-        )
+        keys.add(("newnested", "v"))
         assert keys == set(td.keys(True))
 
         if td_name in ("sub_td", "sub_td2"):
@@ -1630,20 +1622,15 @@ class TestTensorDicts(TestTensorDictsBase):
         for pad_size in paddings:
             padded_td = pad(td, pad_size)
             padded_td._check_batch_size()
-            amount_expanded = [0] * (len(pad_size) // 2)
-            for i in range(0, len(pad_size), 2):
-                amount_expanded[i // 2] = pad_size[i] + pad_size[i + 1]
-
-            for key in padded_td.keys():
-                expected_dims = tuple(
-                    sum(p)
-                    for p in zip(
-                        td[key].shape,
-                        amount_expanded
-                        + [0] * (len(td[key].shape) - len(amount_expanded)),
-                    )
-                )
-                assert padded_td[key].shape == expected_dims
+            amount_expanded = [
+                pad_size[i] + pad_size[i + 1] for i in range(0, len(pad_size), 2)
+            ]
+            assert set(padded_td.keys()) == set(td.keys())
+            for key, item in td.items():
+                expected_dims = list(item.shape)
+                for i, amount in enumerate(amount_expanded):
+                    expected_dims[i] += amount
+                assert padded_td[key].shape == torch.Size(expected_dims)
 
         with pytest.raises(RuntimeError):
             pad(td, [0] * 100)
@@ -1651,8 +1638,8 @@ class TestTensorDicts(TestTensorDictsBase):
         with pytest.raises(RuntimeError):
             pad(td, [0])
 
-    def test_reshape(self, td_name, device):
-        td = getattr(self, td_name)(device)
+    def test_reshape(self, td_name, device, td_reference):
+        td = td_reference
         td_reshape = td.reshape(td.shape)
         assert isinstance(td_reshape, TensorDict)
         assert td_reshape.shape.numel() == td.shape.numel()
@@ -1681,7 +1668,6 @@ class TestTensorDicts(TestTensorDictsBase):
     def test_view(self, td_name, device):
         if td_name in ("permute_td", "sub_td2"):
             pytest.skip("view incompatible with stride / permutation")
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         td.unlock_()  # make sure that the td is not locked
         td_view = td.view(-1)
@@ -1699,27 +1685,23 @@ class TestTensorDicts(TestTensorDictsBase):
         assert (td_view.get("a") == 1).all()
         assert (td.get("a") == 1).all()
 
-    def test_default_nested(self, td_name, device):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+    def test_default_nested(self, td_name, device, td_reference):
+        td = td_reference
         default_val = torch.randn(())
         timbers = td.get(("shiver", "my", "timbers"), default_val)
         assert timbers == default_val
 
-    def test_inferred_view_size(self, td_name, device):
+    def test_inferred_view_size(self, td_name, device, td_reference):
         if td_name in ("permute_td", "sub_td2"):
             pytest.skip("view incompatible with stride / permutation")
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+        td = td_reference
+        td_flat = td.view(-1)
         for i in range(len(td.shape)):
             # replacing every index one at a time
             # with -1, to test that td.view(..., -1, ...)
             # always returns the original tensordict
-            new_shape = [
-                dim_size if dim_idx != i else -1
-                for dim_idx, dim_size in enumerate(td.shape)
-            ]
-            assert td.view(-1).view(*new_shape) is td
+            new_shape = (*td.shape[:i], -1, *td.shape[i + 1 :])
+            assert td_flat.view(*new_shape) is td
             assert td.view(*new_shape) is td
 
     @pytest.mark.parametrize("dim", [0, 1, -1, -5])
@@ -1727,22 +1709,17 @@ class TestTensorDicts(TestTensorDictsBase):
         "key", ["heterogeneous-entry", ("sub", "heterogeneous-entry")]
     )
     def test_nestedtensor_stack(self, td_name, device, dim, key):
-        torch.manual_seed(1)
         td1 = getattr(self, td_name)(device).unlock_()
         td2 = getattr(self, td_name)(device).unlock_()
 
         td1[key] = torch.randn(*td1.shape, 2)
         td2[key] = torch.randn(*td1.shape, 3)
         td_stack = torch.stack([td1, td2], dim)
-        # get will fail
+        # get will fail (td_stack[key] goes through the same _get_tuple call)
         with pytest.raises(
             RuntimeError, match="Found more than one unique shape in the tensors"
         ):
             td_stack.get(key)
-        with pytest.raises(
-            RuntimeError, match="Found more than one unique shape in the tensors"
-        ):
-            td_stack[key]
         if dim in (0, -5):
             # this will work if stack_dim is 0 (or equivalently -self.batch_dims)
             # it is the proper way to get that entry
@@ -1767,7 +1744,6 @@ class TestTensorDicts(TestTensorDictsBase):
         td_stack.clone()
 
     def test_clone_td(self, td_name, device, tmp_path):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         if td_name == "td_h5":
             # need a new file
@@ -1775,7 +1751,7 @@ class TestTensorDicts(TestTensorDictsBase):
             clone = td.clone(newfile=newfile)
         else:
             clone = torch.clone(td)
-        assert (clone == td).all()
+        assert clone.eq_all(td)
         assert td.batch_size == clone.batch_size
         assert type(td.clone(recurse=False)) is type(td)
         if td_name in (
@@ -1794,12 +1770,9 @@ class TestTensorDicts(TestTensorDictsBase):
             assert td.clone(recurse=False).get("a") is td.get("a")
 
     def test_rename_key(self, td_name, device) -> None:
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         if td.is_locked:
-            with pytest.raises(
-                RuntimeError, match=re.escape(TensorDictBase.LOCK_ERROR)
-            ):
+            with pytest.raises(RuntimeError, match=_ERR_LOCK):
                 td.rename_key_("a", "b", safe=True)
         else:
             with pytest.raises(KeyError, match="already present in TensorDict"):
@@ -1838,13 +1811,12 @@ class TestTensorDicts(TestTensorDictsBase):
         torch.testing.assert_close(new_z, td.get("z"))
 
     def test_rename_key_nested(self, td_name, device) -> None:
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         td.unlock_()
-        td["nested", "conflict"] = torch.zeros(td.shape)
+        td["nested", "conflict"] = torch.zeros(td.shape, device=td.device)
         with pytest.raises(KeyError, match="already present in TensorDict"):
             td.rename_key_(("nested", "conflict"), "b", safe=True)
-        td["nested", "first"] = torch.zeros(td.shape)
+        td["nested", "first"] = torch.zeros(td.shape, device=td.device)
         td.rename_key_(("nested", "first"), "second")
         assert (td["second"] == 0).all()
         assert ("nested", "first") not in td.keys(True)
@@ -1853,7 +1825,6 @@ class TestTensorDicts(TestTensorDictsBase):
         assert "second" not in td.keys()
 
     def test_set_nontensor(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         td.unlock_()
         r = torch.randn_like(td.get("a"))
@@ -1869,24 +1840,22 @@ class TestTensorDicts(TestTensorDictsBase):
             ((0, ..., 0), (0,) + (slice(None),) * (TD_BATCH_SIZE - 2) + (0,)),
         ],
     )
-    def test_getitem_ellipsis(self, td_name, device, actual_index, expected_index):
-        torch.manual_seed(1)
+    def test_getitem_ellipsis(
+        self, td_name, device, actual_index, expected_index, td_reference
+    ):
 
-        td = getattr(self, td_name)(device)
+        td = td_reference
 
         actual_td = td[actual_index]
         expected_td = td[expected_index]
         other_expected_td = td.to_tensordict()[expected_index]
-        assert expected_td.shape == _getitem_batch_size(
-            td.batch_size, convert_ellipsis_to_idx(actual_index, td.batch_size)
-        )
+        assert expected_td.shape == _ellipsis_batch_size(actual_index, td.batch_size)
         assert other_expected_td.shape == actual_td.shape
         assert_allclose_td(actual_td, other_expected_td)
         assert_allclose_td(actual_td, expected_td)
 
     @pytest.mark.parametrize("actual_index", [..., (..., 0), (0, ...), (0, ..., 0)])
     def test_setitem_ellipsis(self, td_name, device, actual_index):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
 
         idx = actual_index
@@ -1898,8 +1867,7 @@ class TestTensorDicts(TestTensorDictsBase):
             td_set = actual_td
         td_set.zero_()
 
-        for key in actual_td.keys():
-            assert (actual_td.get(key) == 0).all()
+        assert (actual_td == 0).all()
 
         if td_name in ("td_params",):
             td_set = td_clone.data
@@ -1907,18 +1875,15 @@ class TestTensorDicts(TestTensorDictsBase):
             td_set = td_clone
 
         td_set[idx] = actual_td
-        for key in td_clone.keys():
-            assert (td_clone[idx].get(key) == 0).all()
+        assert (td_clone[idx] == 0).all()
 
     @pytest.mark.parametrize(
         "idx", [slice(1), torch.tensor([0]), torch.tensor([0, 1]), range(1), range(2)]
     )
     def test_setitem(self, td_name, device, idx):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         if isinstance(idx, torch.Tensor) and idx.numel() > 1 and td.shape[0] == 1:
-            pytest.mark.skip("cannot index tensor with desired index")
-            return
+            pytest.skip("cannot index tensor with desired index")
 
         td_clone = td[idx].to_tensordict().zero_()
         if td_name == "td_params":
@@ -1935,34 +1900,31 @@ class TestTensorDicts(TestTensorDictsBase):
             td[idx] = td_clone
 
     def test_setitem_string(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         td.unlock_()
         td["d"] = torch.randn(4, 3, 2, 1, 5)
         assert "d" in td.keys()
 
-    def test_getitem_string(self, td_name, device):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+    def test_getitem_string(self, td_name, device, td_reference):
+        td = td_reference
         assert isinstance(td["a"], (MemmapTensor, torch.Tensor))
 
-    def test_getitem_nestedtuple(self, td_name, device):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+    def test_getitem_nestedtuple(self, td_name, device, td_reference):
+        td = td_reference
         assert isinstance(td[(("a",))], (MemmapTensor, torch.Tensor))
         assert isinstance(td.get((("a",))), (MemmapTensor, torch.Tensor))
 
     def test_setitem_nestedtuple(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         if td.is_locked:
             td.unlock_()
-        td[" a ", (("little", "story")), "about", ("myself",)] = torch.zeros(td.shape)
+        td[" a ", (("little", "story")), "about", ("myself",)] = torch.zeros(
+            td.shape, device=td.device
+        )
         assert (td[" a ", "little", "story", "about", "myself"] == 0).all()
 
-    def test_getitem_range(self, td_name, device):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+    def test_getitem_range(self, td_name, device, td_reference):
+        td = td_reference
         assert_allclose_td(td[range(2)], td[[0, 1]])
         if td_name not in ("td_h5",):
             # for h5, we can't use a double list index
@@ -1979,7 +1941,6 @@ class TestTensorDicts(TestTensorDictsBase):
                 td[idx]
 
     def test_setitem_nested_dict_value(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
 
         # Create equivalent TensorDict and dict nested values for setitem
@@ -1999,9 +1960,8 @@ class TestTensorDicts(TestTensorDictsBase):
         tdt = td.transpose(0, 1)
         assert tdt.shape == torch.Size([td.shape[1], td.shape[0], *td.shape[2:]])
         for key, value in tdt.items(True):
-            assert value.shape == torch.Size(
-                [td.get(key).shape[1], td.get(key).shape[0], *td.get(key).shape[2:]]
-            )
+            shape = td.get(key).shape
+            assert value.shape == torch.Size([shape[1], shape[0], *shape[2:]])
         tdt = td.transpose(-1, -2)
         for key, value in tdt.items(True):
             assert value.shape == td.get(key).transpose(2, 3).shape
@@ -2010,7 +1970,10 @@ class TestTensorDicts(TestTensorDictsBase):
         else:
             assert tdt.transpose(-1, -2) is td
         with td.unlock_():
-            tdt.set(("some", "transposed", "tensor"), torch.zeros(tdt.shape))
+            tdt.set(
+                ("some", "transposed", "tensor"),
+                torch.empty(tdt.shape, device=tdt.device),
+            )
         assert td.get(("some", "transposed", "tensor")).shape == td.shape
         if td_name in ("td_params",):
             assert td.transpose(0, 0)._param_td is td._param_td
@@ -2040,19 +2003,17 @@ class TestTensorDicts(TestTensorDictsBase):
             td.create_nested("root")
 
     def test_tensordict_set(self, td_name, device):
-        torch.manual_seed(1)
-        np.random.seed(1)
         td = getattr(self, td_name)(device)
         td.unlock_()
 
-        # test set
-        val1 = np.ones(shape=(4, 3, 2, 1, 10))
+        # test set (setting numpy arrays is covered by test_set_nontensor)
+        val1 = torch.ones(4, 3, 2, 1, 10, device=device)
         td.set("key1", val1)
         assert (td.get("key1") == 1).all()
         with pytest.raises(RuntimeError):
-            td.set("key1", np.ones(shape=(5, 10)))
+            td.set("key1", torch.ones(5, 10, device=device))
 
-        # test set_
+        # test set_ with a numpy array
         val2 = np.zeros(shape=(4, 3, 2, 1, 10))
         td.set_("key1", val2)
         assert (td.get("key1") == 0).all()
@@ -2064,17 +2025,15 @@ class TestTensorDicts(TestTensorDictsBase):
             err_msg = "setting a value in-place on a stack of TensorDict"
 
         with pytest.raises(KeyError, match=err_msg):
-            td.set_("smartypants", np.ones(shape=(4, 3, 2, 1, 5)))
+            td.set_("smartypants", torch.ones(4, 3, 2, 1, 5, device=device))
 
-        # test set_at_
-        td.set("key2", np.random.randn(4, 3, 2, 1, 5))
-        x = np.ones(shape=(2, 1, 5)) * 42
+        # test set_at_ with a numpy array
+        td.set("key2", torch.randn(4, 3, 2, 1, 5, device=device))
+        x = np.full((2, 1, 5), 42.0)
         td.set_at_("key2", x, (2, 2))
         assert (td.get("key2")[2, 2] == 42).all()
 
     def test_tensordict_set_dict_value(self, td_name, device):
-        torch.manual_seed(1)
-        np.random.seed(1)
         td = getattr(self, td_name)(device)
         td.unlock_()
 
@@ -2101,10 +2060,9 @@ class TestTensorDicts(TestTensorDictsBase):
             err_msg = "setting a value in-place on a stack of TensorDict"
 
         with pytest.raises(KeyError, match=err_msg):
-            td.set_("smartypants", np.ones(shape=(4, 3, 2, 1, 5)))
+            td.set_("smartypants", torch.ones(4, 3, 2, 1, 5, device=device))
 
     def test_delitem(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         if td_name in ("memmap_td",):
             with pytest.raises(RuntimeError, match="Cannot modify"):
@@ -2158,7 +2116,9 @@ class TestTensorDicts(TestTensorDictsBase):
             )
 
         sub_td = td.get_sub_tensordict(index)
-        assert sub_td.shape == td.to_tensordict()[index].shape
+        # only the batch-size is needed: index an empty tensor of that shape
+        # rather than a full copy of td
+        assert sub_td.shape == torch.empty(td.shape, device=device)[index].shape
         assert sub_td.shape == td[index].shape, (td, index)
         td0 = td[index]
         td0 = td0.to_tensordict()
@@ -2174,22 +2134,19 @@ class TestTensorDicts(TestTensorDictsBase):
 
     @pytest.mark.filterwarnings("error")
     def test_stack_onto(self, td_name, device, tmpdir):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         if td_name == "td_h5":
             td0 = td.clone(newfile=tmpdir / "file0.h5").apply_(lambda x: x.zero_())
             td1 = td.clone(newfile=tmpdir / "file1.h5").apply_(lambda x: x.zero_() + 1)
-        else:
+        elif td_name in ("td_params",):
             td0 = td.clone()
-            if td_name in ("td_params",):
-                td0.data.apply_(lambda x: x.zero_())
-            else:
-                td0.apply_(lambda x: x.zero_())
+            td0.data.apply_(lambda x: x.zero_())
             td1 = td.clone()
-            if td_name in ("td_params",):
-                td1.data.apply_(lambda x: x.zero_() + 1)
-            else:
-                td1.apply_(lambda x: x.zero_() + 1)
+            td1.data.apply_(lambda x: x.zero_() + 1)
+        else:
+            # the leaves are filled at allocation: no need to copy td first
+            td0 = torch.zeros_like(td)
+            td1 = torch.ones_like(td)
 
         td_out = td.unsqueeze(1).expand(td.shape[0], 2, *td.shape[1:]).clone()
         td_stack = torch.stack([td0, td1], 1)
@@ -2197,30 +2154,27 @@ class TestTensorDicts(TestTensorDictsBase):
             with pytest.raises(RuntimeError, match="out.batch_size and stacked"):
                 torch.stack([td0, td1], 0, out=td_out)
             return
-        data_ptr_set_before = {val.data_ptr() for val in decompose(td_out)}
+        data_ptrs_before = _ptrs(td_out)
         torch.stack([td0, td1], 1, out=td_out)
-        data_ptr_set_after = {val.data_ptr() for val in decompose(td_out)}
-        assert data_ptr_set_before == data_ptr_set_after
+        assert data_ptrs_before == _ptrs(td_out)
         assert (td_stack == td_out).all()
 
     @pytest.mark.filterwarnings("error")
     def test_stack_tds_on_subclass(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         tds_count = td.batch_size[0]
         tds_batch_size = td.batch_size[1:]
-        tds_list = [
-            TensorDict(
-                source={
-                    "a": torch.ones(*tds_batch_size, 5),
-                    "b": torch.ones(*tds_batch_size, 10),
-                    "c": torch.ones(*tds_batch_size, 3, dtype=torch.long),
-                },
-                batch_size=tds_batch_size,
-                device=device,
-            )
-            for _ in range(tds_count)
-        ]
+        td_proto = TensorDict(
+            source={
+                "a": torch.ones(*tds_batch_size, 5),
+                "b": torch.ones(*tds_batch_size, 10),
+                "c": torch.ones(*tds_batch_size, 3, dtype=torch.long),
+            },
+            batch_size=tds_batch_size,
+            device=device,
+        )
+        # the stacked tensordicts are only read: they can share their leaves
+        tds_list = [td_proto.clone(recurse=False) for _ in range(tds_count)]
         if td_name in ("sub_td", "sub_td2"):
             with pytest.raises(IndexError, match="storages of the indexed tensors"):
                 torch.stack(tds_list, 0, out=td)
@@ -2229,11 +2183,10 @@ class TestTensorDicts(TestTensorDictsBase):
             with pytest.raises(RuntimeError, match="arguments don't support automatic"):
                 torch.stack(tds_list, 0, out=td)
             return
-        data_ptr_set_before = {val.data_ptr() for val in decompose(td)}
+        data_ptrs_before = _ptrs(td)
 
         stacked_td = torch.stack(tds_list, 0, out=td)
-        data_ptr_set_after = {val.data_ptr() for val in decompose(td)}
-        assert data_ptr_set_before == data_ptr_set_after
+        assert data_ptrs_before == _ptrs(td)
         assert stacked_td.batch_size == td.batch_size
         assert stacked_td is td
         for key in ("a", "b", "c"):
@@ -2241,27 +2194,25 @@ class TestTensorDicts(TestTensorDictsBase):
 
     @pytest.mark.filterwarnings("error")
     def test_stack_subclasses_on_td(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
-        td = td.expand(3, *td.batch_size).clone().zero_()
+        # the content of the output is overwritten by the stack: no need to zero it
+        td = td.expand(3, *td.batch_size).clone()
         tds_list = [getattr(self, td_name)(device) for _ in range(3)]
         if td_name == "td_params":
             with pytest.raises(RuntimeError, match="arguments don't support automatic"):
                 torch.stack(tds_list, 0, out=td)
             return
-        data_ptr_set_before = {val.data_ptr() for val in decompose(td)}
+        data_ptrs_before = _ptrs(td)
         stacked_td = stack_td(tds_list, 0, out=td)
-        data_ptr_set_after = {val.data_ptr() for val in decompose(td)}
-        assert data_ptr_set_before == data_ptr_set_after
+        assert data_ptrs_before == _ptrs(td)
         assert stacked_td.batch_size == td.batch_size
         for key in ("a", "b", "c"):
             assert (stacked_td[key] == td[key]).all()
 
     @pytest.mark.parametrize("dim", [0, 1])
     @pytest.mark.parametrize("chunks", [1, 2])
-    def test_chunk(self, td_name, device, dim, chunks):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+    def test_chunk(self, td_name, device, dim, chunks, td_reference):
+        td = td_reference
         if len(td.shape) - 1 < dim:
             pytest.mark.skip(f"no dim {dim} in td")
             return
@@ -2270,10 +2221,17 @@ class TestTensorDicts(TestTensorDictsBase):
         td_chunks = td.chunk(chunks, dim)
         assert len(td_chunks) == chunks
         assert sum([_td.shape[dim] for _td in td_chunks]) == td.shape[dim]
-        assert (torch.cat(td_chunks, dim) == td).all()
-
-    def test_as_tensor(self, td_name, device):
-        td = getattr(self, td_name)(device)
+        # compare every chunk with the matching slice of td rather than
+        # concatenating the chunks back into a full copy
+        offset = 0
+        for td_chunk in td_chunks:
+            size = td_chunk.shape[dim]
+            idx = (slice(None),) * dim + (slice(offset, offset + size),)
+            assert td_chunk.eq_all(td[idx])
+            offset += size
+
+    def test_as_tensor(self, td_name, device, td_reference):
+        td = td_reference
         if "memmap" in td_name and device == torch.device("cpu"):
             tdt = td.as_tensor()
             assert (tdt == td).all()
@@ -2287,7 +2245,6 @@ class TestTensorDicts(TestTensorDictsBase):
             td.as_tensor()
 
     def test_items_values_keys(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         td.unlock_()
         keys = list(td.keys())
@@ -2295,9 +2252,7 @@ class TestTensorDicts(TestTensorDictsBase):
         items = list(td.items())
 
         # Test td.items()
-        constructed_td1 = TensorDict({}, batch_size=td.shape)
-        for key, value in items:
-            constructed_td1.set(key, value)
+        constructed_td1 = TensorDict(dict(items), batch_size=td.shape)
 
         assert (td == constructed_td1).all()
 
@@ -2305,14 +2260,14 @@ class TestTensorDicts(TestTensorDictsBase):
         # items = [key, value] should be verified
         assert len(values) == len(items)
         assert len(keys) == len(items)
-        constructed_td2 = TensorDict({}, batch_size=td.shape)
-        for key, value in list(zip(td.keys(), td.values())):
-            constructed_td2.set(key, value)
+        constructed_td2 = TensorDict(
+            dict(zip(td.keys(), td.values())), batch_size=td.shape
+        )
 
         assert (td == constructed_td2).all()
 
         # Test that keys is sorted
-        assert all(keys[i] <= keys[i + 1] for i in range(len(keys) - 1))
+        assert keys == sorted(keys)
 
         # Add new element to tensor
         a = td.get("a")
@@ -2322,13 +2277,11 @@ class TestTensorDicts(TestTensorDictsBase):
         items = list(td.items())
 
         # Test that keys is still sorted after adding the element
-        assert all(keys[i] <= keys[i + 1] for i in range(len(keys) - 1))
+        assert keys == sorted(keys)
 
         # Test td.items()
         # after adding the new element
-        constructed_td1 = TensorDict({}, batch_size=td.shape)
-        for key, value in items:
-            constructed_td1.set(key, value)
+        constructed_td1 = TensorDict(dict(items), batch_size=td.shape)
 
         assert (td == constructed_td1).all()
 
@@ -2338,9 +2291,9 @@ class TestTensorDicts(TestTensorDictsBase):
         assert len(values) == len(items)
         assert len(keys) == len(items)
 
-        constructed_td2 = TensorDict({}, batch_size=td.shape)
-        for key, value in list(zip(td.keys(), td.values())):
-            constructed_td2.set(key, value)
+        constructed_td2 = TensorDict(
+            dict(zip(td.keys(), td.values())), batch_size=td.shape
+        )
 
         assert (td == constructed_td2).all()
 
@@ -2349,17 +2302,19 @@ class TestTensorDicts(TestTensorDictsBase):
         if td_name in ("td_params",):
             td.apply(lambda x: x.requires_grad_(False))
         td.unlock_()
-        assert not td.get("a").requires_grad
+        a = td.get("a")
+        assert not a.requires_grad
+        new_a = torch.randn_like(a).requires_grad_()
         if td_name in ("td_h5",):
             with pytest.raises(
                 RuntimeError, match="Cannot set a tensor that has requires_grad=True"
             ):
-                td.set("a", torch.randn_like(td.get("a")).requires_grad_())
+                td.set("a", new_a)
             return
         if td_name in ("sub_td", "sub_td2"):
-            td.set_("a", torch.randn_like(td.get("a")).requires_grad_())
+            td.set_("a", new_a)
         else:
-            td.set("a", torch.randn_like(td.get("a")).requires_grad_())
+            td.set("a", new_a)
 
         assert td.get("a").requires_grad
 
@@ -2369,17 +2324,16 @@ class TestTensorDicts(TestTensorDictsBase):
         tdin = TensorDict({"inner": torch.randn(*td.shape, 1)}, [], device=device)
         td["inner_td"] = tdin
         tdin.batch_size = td.batch_size
-        assert (td["inner_td"] == tdin).all()
+        assert td["inner_td"].eq_all(tdin)
 
     def test_nested_td(self, td_name, device):
         td = getattr(self, td_name)(device)
         td.unlock_()
         tdin = TensorDict({"inner": torch.randn(td.shape)}, td.shape, device=device)
         td.set("inner_td", tdin)
-        assert (td["inner_td"] == tdin).all()
+        assert td["inner_td"].eq_all(tdin)
 
     def test_nested_dict_init(self, td_name, device):
-        torch.manual_seed(1)
         td = getattr(self, td_name)(device)
         td.unlock_()
 
@@ -2438,15 +2392,16 @@ class TestTensorDicts(TestTensorDictsBase):
         td = getattr(self, td_name)(device)
         locked = td.is_locked
         td.unlock_()
+        # built on the test device so that setting them in td does not copy them
         nested_nested_tensordict = TensorDict(
             {
-                "a": torch.zeros(*td.shape, 2, 3),
+                "a": torch.zeros(*td.shape, 2, 3, device=device),
             },
             [*td.shape, 2],
         )
         nested_tensordict = TensorDict(
             {
-                "a": torch.zeros(*td.shape, 2),
+                "a": torch.zeros(*td.shape, 2, device=device),
                 "nested_nested_tensordict": nested_nested_tensordict,
             },
             td.shape,
@@ -2478,15 +2433,16 @@ class TestTensorDicts(TestTensorDictsBase):
         td = getattr(self, td_name)(device)
         locked = td.is_locked
         td.unlock_()
+        # built on the test device so that setting them in td does not copy them
         nested_nested_tensordict = TensorDict(
             {
-                "a": torch.zeros(*td.shape, 2, 3),
+                "a": torch.zeros(*td.shape, 2, 3, device=device),
             },
             [*td.shape, 2],
         )
         nested_tensordict = TensorDict(
             {
-                "a": torch.zeros(*td.shape, 2),
+                "a": torch.zeros(*td.shape, 2, device=device),
                 "nested_nested_tensordict": nested_nested_tensordict,
             },
             td.shape,
@@ -2508,12 +2464,12 @@ class TestTensorDicts(TestTensorDictsBase):
             td_unflatten = td_flatten.unflatten_keys(
                 inplace=inplace, separator=separator
             )
-        assert (td == td_unflatten).all()
+        assert td.eq_all(td_unflatten)
         if inplace:
             assert td is td_unflatten
 
-    def test_repr(self, td_name, device):
-        td = getattr(self, td_name)(device)
+    def test_repr(self, td_name, device, td_reference):
+        td = td_reference
         _ = str(td)
 
     def test_memmap_(self, td_name, device):
@@ -2534,8 +2490,8 @@ class TestTensorDicts(TestTensorDictsBase):
             td.memmap_()
             assert td.is_memmap()
 
-    def test_memmap_like(self, td_name, device):
-        td = getattr(self, td_name)(device)
+    def test_memmap_like(self, td_name, device, td_reference):
+        td = td_reference
         tdmemmap = td.memmap_like()
         assert tdmemmap is not td
         for key in td.keys(True):
@@ -2611,45 +2567,19 @@ class TestTensorDicts(TestTensorDictsBase):
 
             if td_name in ("stacked_td", "nested_stacked_td"):
                 assert all(
-                    all(
-                        td3_[key] is value
-                        for key, value in td_.items(
-                            include_nested=True, leaves_only=True
-                        )
-                    )
+                    _same_leaves(td_, td3_)
                     for td_, td3_ in zip(td.tensordicts, td3.tensordicts)
                 )
                 assert all(
-                    all(
-                        td4_[key] is value
-                        for key, value in td2_.items(
-                            include_nested=True, leaves_only=True
-                        )
-                    )
+                    _same_leaves(td2_, td4_)
                     for td2_, td4_ in zip(td2.tensordicts, td4.tensordicts)
                 )
             elif td_name in ("permute_td", "squeezed_td", "unsqueezed_td"):
-                assert all(
-                    td3._source[key] is value
-                    for key, value in td._source.items(
-                        include_nested=True, leaves_only=True
-                    )
-                )
-                assert all(
-                    td4._source[key] is value
-                    for key, value in td2._source.items(
-                        include_nested=True, leaves_only=True
-                    )
-                )
+                assert _same_leaves(td._source, td3._source)
+                assert _same_leaves(td2._source, td4._source)
             else:
-                assert all(
-                    td3[key] is value
-                    for key, value in td.items(include_nested=True, leaves_only=True)
-                )
-                assert all(
-                    td4[key] is value
-                    for key, value in td2.items(include_nested=True, leaves_only=True)
-                )
+                assert _same_leaves(td, td3)
+                assert _same_leaves(td2, td4)
 
     def test_setdefault_missing_key(self, td_name, device):
         td = getattr(self, td_name)(device)
@@ -2697,8 +2627,8 @@ class TestTensorDicts(TestTensorDictsBase):
             torch.testing.assert_close(td.get(("a", "b", "d")), tensor2)
 
     @pytest.mark.parametrize("performer", ["torch", "tensordict"])
-    def test_split(self, td_name, device, performer):
-        td = getattr(self, td_name)(device)
+    def test_split(self, td_name, device, performer, td_reference):
+        td = td_reference
 
         for dim in range(td.batch_dims):
             rep, remainder = divmod(td.shape[dim], 2)
@@ -2751,15 +2681,16 @@ class TestTensorDicts(TestTensorDictsBase):
     def test_pop(self, td_name, device):
         td = getattr(self, td_name)(device)
         assert "a" in td.keys()
-        a = td["a"].clone()
+        # pop only drops the entry, the values need not be cloned
+        a = td["a"]
         with td.unlock_():
             out = td.pop("a")
             assert (out == a).all()
             assert "a" not in td.keys()
 
             assert "b" in td.keys()
-            b = td["b"].clone()
-            default = torch.zeros_like(b).to(device)
+            b = td["b"]
+            default = torch.zeros_like(b)
             assert (default != b).all()
             out = td.pop("b", default)
 
@@ -2777,84 +2708,43 @@ class TestTensorDicts(TestTensorDictsBase):
                 td.pop("z")
 
     def test_setitem_slice(self, td_name, device):
-        td = getattr(self, td_name)(device)
-        if td_name == "td_params":
-            td_set = td.data
-        else:
-            td_set = td
+        def make_td():
+            # every assignment is checked on a fresh tensordict
+            td = getattr(self, td_name)(device)
+            return td, td.data if td_name == "td_params" else td
+
+        td, td_set = make_td()
         td_set[:] = td.clone()
         td_set[:1] = td[:1].clone().zero_()
         assert (td[:1] == 0).all()
-        td = getattr(self, td_name)(device)
-        if td_name == "td_params":
-            td_set = td.data
-        else:
-            td_set = td
-        td_set[:1] = td[:1].to_tensordict().zero_()
-        assert (td[:1] == 0).all()
 
-        # with broadcast
-        td = getattr(self, td_name)(device)
-        if td_name == "td_params":
-            td_set = td.data
-        else:
-            td_set = td
-        td_set[:1] = td[0].clone().zero_()
-        assert (td[:1] == 0).all()
-        td = getattr(self, td_name)(device)
-        if td_name == "td_params":
-            td_set = td.data
-        else:
-            td_set = td
-        td_set[:1] = td[0].to_tensordict().zero_()
-        assert (td[:1] == 0).all()
-
-        td = getattr(self, td_name)(device)
-        if td_name == "td_params":
-            td_set = td.data
-        else:
-            td_set = td
-        td_set[:1, 0] = td[0, 0].clone().zero_()
-        assert (td[:1, 0] == 0).all()
-        td = getattr(self, td_name)(device)
-        if td_name == "td_params":
-            td_set = td.data
-        else:
-            td_set = td
-        td_set[:1, 0] = td[0, 0].to_tensordict().zero_()
-        assert (td[:1, 0] == 0).all()
-
-        td = getattr(self, td_name)(device)
-        if td_name == "td_params":
-            td_set = td.data
-        else:
-            td_set = td
-        td_set[:1, :, 0] = td[0, :, 0].clone().zero_()
-        assert (td[:1, :, 0] == 0).all()
-        td = getattr(self, td_name)(device)
-        if td_name == "td_params":
-            td_set = td.data
-        else:
-            td_set = td
-        td_set[:1, :, 0] = td[0, :, 0].to_tensordict().zero_()
-        assert (td[:1, :, 0] == 0).all()
-
-    def test_casts(self, td_name, device):
-        td = getattr(self, td_name)(device)
-        tdfloat = td.float()
-        assert all(value.dtype is torch.float for value in tdfloat.values(True, True))
-        tddouble = td.double()
-        assert all(value.dtype is torch.double for value in tddouble.values(True, True))
-        tdbfloat16 = td.bfloat16()
-        assert all(
-            value.dtype is torch.bfloat16 for value in tdbfloat16.values(True, True)
+        for dest_idx, src_idx, make_rhs in (
+            (slice(None, 1), slice(None, 1), "to_tensordict"),
+            # with broadcast
+            (slice(None, 1), 0, "clone"),
+            (slice(None, 1), 0, "to_tensordict"),
+            ((slice(None, 1), 0), (0, 0), "clone"),
+            ((slice(None, 1), 0), (0, 0), "to_tensordict"),
+            ((slice(None, 1), slice(None), 0), (0, slice(None), 0), "clone"),
+            ((slice(None, 1), slice(None), 0), (0, slice(None), 0), "to_tensordict"),
+        ):
+            td, td_set = make_td()
+            td_set[dest_idx] = getattr(td[src_idx], make_rhs)().zero_()
+            assert (td[dest_idx] == 0).all()
+
+    def test_casts(self, td_name, device, td_reference):
+        td = td_reference
+        casts = (
+            (td.float, torch.float),
+            (td.double, torch.double),
+            (td.bfloat16, torch.bfloat16),
+            (td.half, torch.half),
+            (td.int, torch.int),
+            (functools.partial(td.type, torch.int), torch.int),
         )
-        tdhalf = td.half()
-        assert all(value.dtype is torch.half for value in tdhalf.values(True, True))
-        tdint = td.int()
-        assert all(value.dtype is torch.int for value in tdint.values(True, True))
-        tdint = td.type(torch.int)
-        assert all(value.dtype is torch.int for value in tdint.values(True, True))
+        for cast, dtype in casts:
+            # a single pass collects the dtypes of all the leaves
+            assert {value.dtype for value in cast().values(True, True)} == {dtype}
 
     def test_empty_like(self, td_name, device):
         if "sub_td" in td_name:
@@ -2910,16 +2800,18 @@ class TestTensorDicts(TestTensorDictsBase):
             assert (value == 0).all()
 
 
-@pytest.mark.parametrize("device", [None, *get_available_devices()])
+@pytest.mark.parametrize("device", [None, *_DEVICES])
 @pytest.mark.parametrize("dtype", [torch.float32, torch.uint8])
 class TestTensorDictRepr:
-    def td(self, device, dtype):
+    @staticmethod
+    def _device_not_none(device):
+        # the first cuda device if any, reusing the devices probed at import
         if device is not None:
-            device_not_none = device
-        elif torch.has_cuda and torch.cuda.device_count():
-            device_not_none = torch.device("cuda:0")
-        else:
-            device_not_none = torch.device("cpu")
+            return device
+        return _DEVICES_NOCPU[0] if _DEVICES_NOCPU else _DEVICES[0]
+
+    def td(self, device, dtype):
+        device_not_none = self._device_not_none(device)
 
         return TensorDict(
             source={
@@ -2930,12 +2822,7 @@ class TestTensorDictRepr:
         )
 
     def nested_td(self, device, dtype):
-        if device is not None:
-            device_not_none = device
-        elif torch.has_cuda and torch.cuda.device_count():
-            device_not_none = torch.device("cuda:0")
-        else:
-            device_not_none = torch.device("cpu")
+        device_not_none = self._device_not_none(device)
         return TensorDict(
             source={
                 "my_nested_td": self.td(device, dtype),
@@ -2954,12 +2841,7 @@ class TestTensorDictRepr:
             y: "MyClass"
             z: str
 
-        if device is not None:
-            device_not_none = device
-        elif torch.has_cuda and torch.cuda.device_count():
-            device_not_none = torch.device("cuda:0")
-        else:
-            device_not_none = torch.device("cpu")
+        device_not_none = self._device_not_none(device)
         nested_class = MyClass(
             X=torch.zeros(4, 3, 2, 1, dtype=dtype, device=device_not_none),
             y=MyClass(
@@ -2981,12 +2863,7 @@ class TestTensorDictRepr:
         )
 
     def stacked_td(self, device, dtype):
-        if device is not None:
-            device_not_none = device
-        elif torch.has_cuda and torch.cuda.device_count():
-            device_not_none = torch.device("cuda:0")
-        else:
-            device_not_none = torch.device("cpu")
+        device_not_none = self._device_not_none(device)
         td1 = TensorDict(
             source={
                 "a": torch.zeros(4, 3, 1, 5, dtype=dtype, device=device_not_none),
@@ -3014,15 +2891,9 @@ class TestTensorDictRepr:
 
     def test_repr_plain(self, device, dtype):
         tensordict = self.td(device, dtype)
-        if device is not None and device.type == "cuda":
-            is_shared = True
-        else:
-            is_shared = False
+        is_shared = _is_cuda(device)
         tensor_device = device if device else tensordict["a"].device
-        if tensor_device.type == "cuda":
-            is_shared_tensor = True
-        else:
-            is_shared_tensor = is_shared
+        is_shared_tensor = _is_cuda(tensor_device) or is_shared
         expected = f"""TensorDict(
     fields={{
         a: Tensor(shape=torch.Size([4, 3, 2, 1, 5]), device={tensor_device}, dtype={dtype}, is_shared={is_shared_tensor})}},
@@ -3049,10 +2920,7 @@ class TestTensorDictRepr:
         is_shared = True
         tensor_class = "Tensor"
         tensor_device = device if device else tensordict["a"].device
-        if tensor_device.type == "cuda":
-            is_shared_tensor = True
-        else:
-            is_shared_tensor = is_shared
+        is_shared_tensor = _is_cuda(tensor_device) or is_shared
         expected = f"""TensorDict(
     fields={{
         a: {tensor_class}(shape=torch.Size([4, 3, 2, 1, 5]), device={tensor_device}, dtype={dtype}, is_shared={is_shared_tensor})}},
@@ -3063,16 +2931,10 @@ class TestTensorDictRepr:
 
     def test_repr_nested(self, device, dtype):
         nested_td = self.nested_td(device, dtype)
-        if device is not None and device.type == "cuda":
-            is_shared = True
-        else:
-            is_shared = False
+        is_shared = _is_cuda(device)
         tensor_class = "Tensor"
         tensor_device = device if device else nested_td["b"].device
-        if tensor_device.type == "cuda":
-            is_shared_tensor = True
-        else:
-            is_shared_tensor = is_shared
+        is_shared_tensor = _is_cuda(tensor_device) or is_shared
         expected = f"""TensorDict(
     fields={{
         b: {tensor_class}(shape=torch.Size([4, 3, 2, 1, 5]), device={tensor_device}, dtype={dtype}, is_shared={is_shared_tensor}),
@@ -3090,16 +2952,10 @@ class TestTensorDictRepr:
     def test_repr_nested_update(self, device, dtype):
         nested_td = self.nested_td(device, dtype)
         nested_td["my_nested_td"].rename_key_("a", "z")
-        if device is not None and device.type == "cuda":
-            is_shared = True
-        else:
-            is_shared = False
+        is_shared = _is_cuda(device)
         tensor_class = "Tensor"
         tensor_device = device if device else nested_td["b"].device
-        if tensor_device.type == "cuda":
-            is_shared_tensor = True
-        else:
-            is_shared_tensor = is_shared
+        is_shared_tensor = _is_cuda(tensor_device) or is_shared
         expected = f"""TensorDict(
     fields={{
         b: {tensor_class}(shape=torch.Size([4, 3, 2, 1, 5]), device={tensor_device}, dtype={dtype}, is_shared={is_shared_tensor}),
@@ -3116,16 +2972,10 @@ class TestTensorDictRepr:
 
     def test_repr_stacked(self, device, dtype):
         stacked_td = self.stacked_td(device, dtype)
-        if device is not None and device.type == "cuda":
-            is_shared = True
-        else:
-            is_shared = False
+        is_shared = _is_cuda(device)
         tensor_class = "Tensor"
         tensor_device = device if device else stacked_td["a"].device
-        if tensor_device.type == "cuda":
-            is_shared_tensor = True
-        else:
-            is_shared_tensor = is_shared
+        is_shared_tensor = _is_cuda(tensor_device) or is_shared
         expected = f"""LazyStackedTensorDict(
     fields={{
         a: {tensor_class}(shape=torch.Size([4, 3, 2, 1, 5]), device={tensor_device}, dtype={dtype}, is_shared={is_shared_tensor})}},
@@ -3161,15 +3011,9 @@ class TestTensorDictRepr:
                 ),
             ]
         )
-        if device is not None and device.type == "cuda":
-            is_shared = True
-        else:
-            is_shared = False
+        is_shared = _is_cuda(device)
         tensor_device = device if device else torch.device("cpu")
-        if tensor_device.type == "cuda":
-            is_shared_tensor = True
-        else:
-            is_shared_tensor = is_shared
+        is_shared_tensor = _is_cuda(tensor_device) or is_shared
         expected = f"""LazyStackedTensorDict(
     fields={{
         a: Tensor(shape=torch.Size([2, -1]), device={tensor_device}, dtype={dtype}, is_shared={is_shared_tensor}),
@@ -3185,16 +3029,10 @@ class TestTensorDictRepr:
     @pytest.mark.parametrize("index", [None, (slice(None), 0)])
     def test_repr_indexed_tensordict(self, device, dtype, index):
         tensordict = self.td(device, dtype)[index]
-        if device is not None and device.type == "cuda":
-            is_shared = True
-        else:
-            is_shared = False
+        is_shared = _is_cuda(device)
         tensor_class = "Tensor"
         tensor_device = device if device else tensordict["a"].device
-        if tensor_device.type == "cuda":
-            is_shared_tensor = True
-        else:
-            is_shared_tensor = is_shared
+        is_shared_tensor = _is_cuda(tensor_device) or is_shared
         if index is None:
             expected = f"""TensorDict(
     fields={{
@@ -3215,16 +3053,10 @@ class TestTensorDictRepr:
     @pytest.mark.parametrize("index", [None, (slice(None), 0)])
     def test_repr_indexed_nested_tensordict(self, device, dtype, index):
         nested_tensordict = self.nested_td(device, dtype)[index]
-        if device is not None and device.type == "cuda":
-            is_shared = True
-        else:
-            is_shared = False
+        is_shared = _is_cuda(device)
         tensor_class = "Tensor"
         tensor_device = device if device else nested_tensordict["b"].device
-        if tensor_device.type == "cuda":
-            is_shared_tensor = True
-        else:
-            is_shared_tensor = is_shared
+        is_shared_tensor = _is_cuda(tensor_device) or is_shared
         if index is None:
             expected = f"""TensorDict(
     fields={{
@@ -3253,19 +3085,12 @@ class TestTensorDictRepr:
     is_shared={is_shared})"""
         assert repr(nested_tensordict) == expected
 
-    @pytest.mark.parametrize("index", [None, (slice(None), 0)])
-    def test_repr_indexed_stacked_tensordict(self, device, dtype, index):
+    def test_repr_indexed_stacked_tensordict(self, device, dtype):
         stacked_tensordict = self.stacked_td(device, dtype)
-        if device is not None and device.type == "cuda":
-            is_shared = True
-        else:
-            is_shared = False
+        is_shared = _is_cuda(device)
         tensor_class = "Tensor"
         tensor_device = device if device else stacked_tensordict["a"].device
-        if tensor_device.type == "cuda":
-            is_shared_tensor = True
-        else:
-            is_shared_tensor = is_shared
+        is_shared_tensor = _is_cuda(tensor_device) or is_shared
 
         expected = f"""LazyStackedTensorDict(
     fields={{
@@ -3283,22 +3108,16 @@ class TestTensorDictRepr:
         assert repr(stacked_tensordict) == expected
 
     @pytest.mark.skipif(not torch.cuda.device_count(), reason="no cuda")
-    @pytest.mark.parametrize("device_cast", get_available_devices())
+    @pytest.mark.parametrize("device_cast", _DEVICES)
     def test_repr_device_to_device(self, device, dtype, device_cast):
         td = self.td(device, dtype)
-        if (device_cast is None and (torch.cuda.device_count() > 0)) or (
-            device_cast is not None and device_cast.type == "cuda"
-        ):
-            is_shared = True
-        else:
-            is_shared = False
+        is_shared = _is_cuda(device_cast) or (
+            device_cast is None and torch.cuda.device_count() > 0
+        )
         tensor_class = "Tensor"
         td2 = td.to(device_cast)
         tensor_device = device_cast if device_cast else td2["a"].device
-        if tensor_device.type == "cuda":
-            is_shared_tensor = True
-        else:
-            is_shared_tensor = is_shared
+        is_shared_tensor = _is_cuda(tensor_device) or is_shared
         expected = f"""TensorDict(
     fields={{
         a: {tensor_class}(shape=torch.Size([4, 3, 2, 1, 5]), device={tensor_device}, dtype={dtype}, is_shared={is_shared_tensor})}},
@@ -3311,15 +3130,10 @@ class TestTensorDictRepr:
     def test_repr_batch_size_update(self, device, dtype):
         td = self.td(device, dtype)
         td.batch_size = torch.Size([4, 3, 2])
-        is_shared = False
+        is_shared = _is_cuda(device)
         tensor_class = "Tensor"
-        if device is not None and device.type == "cuda":
-            is_shared = True
         tensor_device = device if device else td["a"].device
-        if tensor_device.type == "cuda":
-            is_shared_tensor = True
-        else:
-            is_shared_tensor = is_shared
+        is_shared_tensor = _is_cuda(tensor_device) or is_shared
         expected = f"""TensorDict(
     fields={{
         a: {tensor_class}(shape=torch.Size([4, 3, 2, 1, 5]), device={tensor_device}, dtype={dtype}, is_shared={is_shared_tensor})}},
@@ -3339,18 +3153,24 @@ class TestTensorDictRepr:
         "unsqueezed_td",
         "td_reset_bs",
     ],
+    scope="class",
 )
-@pytest.mark.parametrize(
-    "device",
-    get_available_devices(),
-)
+@pytest.mark.parametrize("device", _DEVICES, scope="class")
 class TestTensorDictsRequiresGrad:
+    @pytest.fixture(scope="class")
+    def td_reference(self, td_name, device):
+        """A tensordict built once per (td_name, device) pair.
+
+        All the tests of this class only read from it.
+        """
+        return getattr(self, td_name)(device)
+
     def td(self, device):
         return TensorDict(
             source={
-                "a": torch.randn(3, 1, 5, device=device),
+                "a": torch.empty(3, 1, 5, device=device),
                 "b": torch.randn(3, 1, 10, device=device, requires_grad=True),
-                "c": torch.randint(10, (3, 1, 3), device=device),
+                "c": torch.empty(3, 1, 3, dtype=torch.long, device=device),
             },
             batch_size=[3, 1],
         )
@@ -3373,15 +3193,13 @@ class TestTensorDictsRequiresGrad:
         td.batch_size = torch.Size([3, 1])
         return td
 
-    def test_view(self, td_name, device):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+    def test_view(self, td_reference):
+        td = td_reference
         td_view = td.view(-1)
         assert td_view.get("b").requires_grad
 
-    def test_expand(self, td_name, device):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+    def test_expand(self, td_reference):
+        td = td_reference
         batch_size = td.batch_size
         new_td = td.expand(3, *batch_size)
         assert new_td.get("b").requires_grad
@@ -3394,20 +3212,18 @@ class TestTensorDictsRequiresGrad:
     #     td_td = td.to(TensorDict)
     #     assert td_td.get("b").requires_grad
 
-    def test_clone_td(self, td_name, device):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+    def test_clone_td(self, td_reference):
+        td = td_reference
         assert torch.clone(td).get("b").requires_grad
 
-    def test_squeeze(self, td_name, device, squeeze_dim=-1):
-        torch.manual_seed(1)
-        td = getattr(self, td_name)(device)
+    def test_squeeze(self, td_reference, squeeze_dim=-1):
+        td = td_reference
         assert torch.squeeze(td, dim=-1).get("b").requires_grad
 
 
 def test_batchsize_reset():
     td = TensorDict(
-        {"a": torch.randn(3, 4, 5, 6), "b": torch.randn(3, 4, 5)}, batch_size=[3, 4]
+        {"a": torch.empty(3, 4, 5, 6), "b": torch.empty(3, 4, 5)}, batch_size=[3, 4]
     )
     # smoke-test
     td.batch_size = torch.Size([3])
@@ -3429,7 +3245,7 @@ def test_batchsize_reset():
         td.batch_size = [3, 5]
 
     # test set
-    td.set("c", torch.randn(3))
+    td.set("c", torch.empty(3))
 
     # test index
     td[torch.tensor([1, 2])]
@@ -3441,13 +3257,14 @@ def test_batchsize_reset():
     ):
         td[:, 0]
 
-    # test a greater batch_size
+
+def test_batchsize_reset_greater():
     td = TensorDict(
-        {"a": torch.randn(3, 4, 5, 6), "b": torch.randn(3, 4, 5)}, batch_size=[3, 4]
+        {"a": torch.empty(3, 4, 5, 6), "b": torch.empty(3, 4, 5)}, batch_size=[3, 4]
     )
     td.batch_size = torch.Size([3, 4, 5])
 
-    td.set("c", torch.randn(3, 4, 5, 6))
+    td.set("c", torch.empty(3, 4, 5, 6))
     with pytest.raises(
         RuntimeError,
         match=re.escape(
@@ -3455,41 +3272,25 @@ def test_batchsize_reset():
             "got self.batch_size=torch.Size([3, 4, 5]) and value.shape[:self.batch_dims]=torch.Size([3, 4, 2])"
         ),
     ):
-        td.set("d", torch.randn(3, 4, 2))
-
-    # test that lazy tds return an exception
-    td_stack = stack_td([TensorDict({"a": torch.randn(3)}, [3]) for _ in range(2)])
-    with pytest.raises(
-        RuntimeError,
-        match=re.escape(
-            "modifying the batch size of a lazy repesentation "
-            "of a tensordict is not permitted. Consider instantiating the tensordict first by calling `td = td.to_tensordict()` before resetting the batch size."
-        ),
-    ):
-        td_stack.batch_size = [2]
-    td_stack.to_tensordict().batch_size = [2]
-
-    td = TensorDict({"a": torch.randn(3, 4)}, [3, 4])
-    subtd = td.get_sub_tensordict((slice(None), torch.tensor([1, 2])))
-    with pytest.raises(
-        RuntimeError,
-        match=re.escape(
-            "modifying the batch size of a lazy repesentation of a tensordict is not permitted. Consider instantiating the tensordict first by calling `td = td.to_tensordict()` before resetting the batch size."
-        ),
-    ):
-        subtd.batch_size = [3, 2]
-    subtd.to_tensordict().batch_size = [3, 2]
-
-    td = TensorDict({"a": torch.randn(3, 4)}, [3, 4])
-    td_u = td.unsqueeze(0)
-    with pytest.raises(
-        RuntimeError,
-        match=re.escape(
-            "modifying the batch size of a lazy repesentation of a tensordict is not permitted. Consider instantiating the tensordict first by calling `td = td.to_tensordict()` before resetting the batch size."
-        ),
-    ):
-        td_u.batch_size = [1]
-    td_u.to_tensordict().batch_size = [1]
+        td.set("d", torch.empty(3, 4, 2))
+
+
+@pytest.mark.parametrize("td_type", ["stack", "sub", "unsqueeze"])
+def test_batchsize_reset_lazy(td_type):
+    # lazy tds cannot have their batch size modified
+    if td_type == "stack":
+        td = stack_td([TensorDict({"a": torch.empty(3)}, [3]) for _ in range(2)])
+        batch_size = [2]
+    elif td_type == "sub":
+        td = TensorDict({"a": torch.empty(3, 4)}, [3, 4])
+        td = td.get_sub_tensordict((slice(None), torch.tensor([1, 2])))
+        batch_size = [3, 2]
+    else:
+        td = TensorDict({"a": torch.empty(3, 4)}, [3, 4]).unsqueeze(0)
+        batch_size = [1]
+    with pytest.raises(RuntimeError, match=_ERR_LAZY_BATCH_SIZE):
+        td.batch_size = batch_size
+    td.to_tensordict().batch_size = batch_size
 
 
 @pytest.mark.parametrize("index0", [None, slice(None)])
@@ -3522,11 +3323,11 @@ def test_create_on_device():
     td = TensorDict({}, [5])
     assert td.device is None
 
-    td.set("a", torch.randn(5, device=device))
+    td.set("a", torch.empty(5, device=device))
     assert td.device is None
 
     td = TensorDict({}, [5], device="cuda:0")
-    td.set("a", torch.randn(5, 1))
+    td.set("a", torch.empty(5, 1))
     assert td.get("a").device == device
 
     # stacked TensorDict
@@ -3535,7 +3336,7 @@ def test_create_on_device():
     stackedtd = stack_td([td1, td2], 0)
     assert stackedtd.device is None
 
-    stackedtd.set("a", torch.randn(2, 5, device=device))
+    stackedtd.set("a", torch.empty(2, 5, device=device))
     assert stackedtd.device is None
 
     stackedtd = stackedtd.to(device)
@@ -3544,7 +3345,7 @@ def test_create_on_device():
     td1 = TensorDict({}, [5], device="cuda:0")
     td2 = TensorDict({}, [5], device="cuda:0")
     stackedtd = stack_td([td1, td2], 0)
-    stackedtd.set("a", torch.randn(2, 5, 1))
+    stackedtd.set("a", torch.empty(2, 5, 1))
     assert stackedtd.get("a").device == device
     assert td1.get("a").device == device
     assert td2.get("a").device == device
@@ -3554,7 +3355,7 @@ def test_create_on_device():
     subtd = td[1]
     assert subtd.device is None
 
-    subtd.set("a", torch.randn(1, device=device))
+    subtd.set("a", torch.empty(1, device=device))
     # setting element of subtensordict doesn't set top-level device
     assert subtd.device is None
 
@@ -3564,12 +3365,12 @@ def test_create_on_device():
 
     td = TensorDict({}, [5], device="cuda:0")
     subtd = td[1]
-    subtd.set("a", torch.randn(1))
+    subtd.set("a", torch.empty(1))
     assert subtd.get("a").device == device
 
     td = TensorDict({}, [5], device="cuda:0")
     subtd = td[1:3]
-    subtd.set("a", torch.randn(2))
+    subtd.set("a", torch.empty(2))
     assert subtd.get("a").device == device
 
     # ViewedTensorDict
@@ -3590,6 +3391,11 @@ def test_create_on_device():
 
 def _remote_process(worker_id, command_pipe_child, command_pipe_parent, tensordict):
     command_pipe_parent.close()
+    # reused by the update commands rather than building a tensordict each time
+    scratch = TensorDict(
+        {"a": tensordict.get("a").clone()},
+        batch_size=tensordict.batch_size,
+    )
     while True:
         cmd, val = command_pipe_child.recv()
         if cmd == "recv":
@@ -3610,20 +3416,12 @@ def _remote_process(worker_id, command_pipe_child, command_pipe_parent, tensordi
             tensordict.set_("done", torch.zeros(1, dtype=torch.bool))
             command_pipe_child.send("done")
         elif cmd == "update":
-            tensordict.update_(
-                TensorDict(
-                    source={"a": tensordict.get("a").clone() + 1},
-                    batch_size=tensordict.batch_size,
-                )
-            )
+            scratch.get("a").copy_(tensordict.get("a")).add_(1)
+            tensordict.update_(scratch)
             command_pipe_child.send("done")
         elif cmd == "update_":
-            tensordict.update_(
-                TensorDict(
-                    source={"a": tensordict.get("a").clone() - 1},
-                    batch_size=tensordict.batch_size,
-                )
-            )
+            scratch.get("a").copy_(tensordict.get("a")).sub_(1)
+            tensordict.update_(scratch)
             command_pipe_child.send("done")
 
         elif cmd == "close":
@@ -3631,6 +3429,17 @@ def _remote_process(worker_id, command_pipe_child, command_pipe_parent, tensordi
             break
 
 
+def _dispatch(parents, cmd, vals=None):
+    # all the workers get the command before we wait on any of them, such
+    # that they process it concurrently
+    if vals is None:
+        vals = range(len(parents))
+    for parent, val in zip(parents, vals):
+        parent.send((cmd, val))
+    for parent in parents:
+        assert parent.recv() == "done"
+
+
 def _driver_func(tensordict, tensordict_unbind):
     procs = []
     children = []
@@ -3650,46 +3459,28 @@ def _driver_func(tensordict, tensordict_unbind):
 
     b = torch.ones(2, 1) * 10
     tensordict.set_("b", b)
-    for i in range(2):
-        parents[i].send(("recv", 10))
-        is_done = parents[i].recv()
-        assert is_done == "done"
+    _dispatch(parents, "recv", [10] * len(parents))
 
-    for i in range(2):
-        parents[i].send(("send", i))
-        is_done = parents[i].recv()
-        assert is_done == "done"
+    _dispatch(parents, "send")
     a = tensordict.get("a").clone()
     assert (a[0] == 0).all()
     assert (a[1] == 1).all()
 
     assert not tensordict.get("done").any()
-    for i in range(2):
-        parents[i].send(("set_done", i))
-        is_done = parents[i].recv()
-        assert is_done == "done"
+    _dispatch(parents, "set_done")
     assert tensordict.get("done").all()
 
-    for i in range(2):
-        parents[i].send(("set_undone_", i))
-        is_done = parents[i].recv()
-        assert is_done == "done"
+    _dispatch(parents, "set_undone_")
     assert not tensordict.get("done").any()
 
-    a_prev = tensordict.get("a").clone().contiguous()
-    for i in range(2):
-        parents[i].send(("update_", i))
-        is_done = parents[i].recv()
-        assert is_done == "done"
-    new_a = tensordict.get("a").clone().contiguous()
+    a_prev = tensordict.get("a").clone()
+    _dispatch(parents, "update_")
+    new_a = tensordict.get("a").clone()
     torch.testing.assert_close(a_prev - 1, new_a)
 
-    a_prev = tensordict.get("a").clone().contiguous()
-    for i in range(2):
-        parents[i].send(("update", i))
-        is_done = parents[i].recv()
-        assert is_done == "done"
-    new_a = tensordict.get("a").clone().contiguous()
+    a_prev = tensordict.get("a").clone()
+    _dispatch(parents, "update")
+    new_a = tensordict.get("a").clone()
     torch.testing.assert_close(a_prev + 1, new_a)
 
     for i in range(2):
@@ -3768,26 +3559,31 @@ def test_mp(td_type):
 def test_getitem_batch_size(idx):
     shape = [10, 7, 11, 5]
     shape = torch.Size(shape)
-    mocking_tensor = torch.zeros(*shape)
+    if any(
+        isinstance(_idx, torch.Tensor) and _idx.dtype is torch.bool
+        for _idx in (idx if isinstance(idx, tuple) else (idx,))
+    ):
+        # the shape indexed by a mask depends on its content
+        mocking_tensor = torch.zeros(shape)
+    else:
+        mocking_tensor = torch.empty(shape, device="meta")
     expected_shape = mocking_tensor[idx].shape
     resulting_shape = _getitem_batch_size(shape, idx)
     assert expected_shape == resulting_shape, (idx, expected_shape, resulting_shape)
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_requires_grad(device):
     torch.manual_seed(1)
+    key1 = torch.randn(10, 11, 12, 5, device=device)
+    key2 = torch.zeros(10, 11, 12, 50, device=device, dtype=torch.bool).bernoulli_()
     # Just one of the tensors have requires_grad
     tensordicts = [
         TensorDict(
             batch_size=[11, 12],
             source={
-                "key1": torch.randn(
-                    11, 12, 5, device=device, requires_grad=True if i == 5 else False
-                ),
-                "key2": torch.zeros(
-                    11, 12, 50, device=device, dtype=torch.bool
-                ).bernoulli_(),
+                "key1": key1[i].requires_grad_() if i == 5 else key1[i],
+                "key2": key2[i],
             },
         )
         for i in range(10)
@@ -3797,7 +3593,7 @@ def test_requires_grad(device):
     assert list(stacked_td.values())[0].requires_grad is True
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 @pytest.mark.parametrize(
     "td_type", ["tensordict", "view", "unsqueeze", "squeeze", "stack"]
 )
@@ -3816,8 +3612,9 @@ def test_filling_empty_tensordict(device, td_type, update):
     else:
         raise NotImplementedError
 
+    other_tds = TensorDict({"a": torch.randn(16, 10), "b": torch.ones(16, 1)}, [16])
     for i in range(16):
-        other_td = TensorDict({"a": torch.randn(10), "b": torch.ones(1)}, [])
+        other_td = other_tds[i]
         if td_type == "unsqueeze":
             other_td = other_td.unsqueeze(-1).to_tensordict()
         if update:
@@ -3865,7 +3662,7 @@ def test_getitem_nested():
 
 
 def test_setitem_nested():
-    tensor = torch.randn(4, 5, 6, 7)
+    tensor = torch.empty(4, 5, 6, 7)
     tensor2 = torch.ones(4, 5, 6, 7)
     tensordict = TensorDict({}, [4])
     sub_tensordict = TensorDict({}, [4, 5])
@@ -3889,7 +3686,7 @@ def test_setitem_nested():
 
 
 def test_setdefault_nested():
-    tensor = torch.randn(4, 5, 6, 7)
+    tensor = torch.empty(4, 5, 6, 7)
     tensor2 = torch.ones(4, 5, 6, 7)
     sub_sub_tensordict = TensorDict({"c": tensor}, [4, 5, 6])
     sub_tensordict = TensorDict({"b": sub_sub_tensordict}, [4, 5])
@@ -3935,13 +3732,8 @@ def test_select_nested(inplace):
     }
 
     if inplace:
+        # same object, so the keys checked above are the tensordict's
         assert selected is tensordict
-        assert set(tensordict.keys(include_nested=True)) == {
-            "b",
-            "nested",
-            ("nested", "double_nested"),
-            ("nested", "double_nested", "t2"),
-        }
     else:
         assert selected is not tensordict
         assert set(tensordict.keys(include_nested=True)) == {
@@ -3999,14 +3791,8 @@ def test_exclude_nested(inplace):
     }
 
     if inplace:
+        # same object, so the keys checked above are the tensordict's
         assert excluded is tensordict
-        assert set(tensordict.keys(include_nested=True)) == {
-            "a",
-            "c",
-            "nested",
-            ("nested", "double_nested"),
-            ("nested", "double_nested", "t1"),
-        }
     else:
         assert excluded is not tensordict
         assert set(tensordict.keys(include_nested=True)) == {
@@ -4025,7 +3811,7 @@ def test_exclude_nested(inplace):
 
 
 def test_set_nested_keys():
-    tensor = torch.randn(4, 5, 6, 7)
+    tensor = torch.empty(4, 5, 6, 7)
     tensor2 = torch.ones(4, 5, 6, 7)
     tensordict = TensorDict({}, [4])
     sub_tensordict = TensorDict({}, [4, 5])
@@ -4041,7 +3827,7 @@ def test_set_nested_keys():
 
 
 def test_keys_view():
-    tensor = torch.randn(4, 5, 6, 7)
+    tensor = torch.empty(4, 5, 6, 7)
     sub_sub_tensordict = TensorDict({"c": tensor}, [4, 5, 6])
     sub_tensordict = TensorDict({}, [4, 5])
     tensordict = TensorDict({}, [4])
@@ -4093,7 +3879,6 @@ def test_error_on_contains():
 
 @pytest.mark.parametrize("method", ["share_memory", "memmap"])
 def test_memory_lock(method):
-    torch.manual_seed(1)
     td = TensorDict({"a": torch.randn(4, 5)}, batch_size=(4, 5))
 
     # lock=True
@@ -4117,6 +3902,23 @@ def test_memory_lock(method):
         td.set("b", torch.randn(4, 5), inplace=True)
 
 
+@pytest.mark.parametrize("method", ["batch_size", "share_memory", "memmap"])
+def test_repr_locked_nested_update(method):
+    # the repr of a locked tensordict must follow changes made to its children
+    td = TensorDict({"sub": TensorDict({"a": torch.zeros(3, 4)}, [3, 4])}, [3])
+    td.lock_()
+    assert "batch_size=torch.Size([3, 4])" in repr(td)
+    if method == "batch_size":
+        td["sub"].batch_size = [3]
+        assert "batch_size=torch.Size([3, 4])" not in repr(td)
+    elif method == "share_memory":
+        td["sub"].share_memory_()
+        assert "is_shared=True" in repr(td)
+    else:
+        td["sub"].memmap_()
+        assert "MemmapTensor" in repr(td)
+
+
 class TestMakeTensorDict:
     def test_create_tensordict(self):
         tensordict = make_tensordict(a=torch.zeros(3, 4))
@@ -4154,7 +3956,7 @@ class TestMakeTensorDict:
         )
         assert tensordict.batch_size == torch.Size([])
 
-    @pytest.mark.parametrize("device", get_available_devices())
+    @pytest.mark.parametrize("device", _DEVICES)
     def test_tensordict_device(self, device):
         tensordict = make_tensordict(
             a=torch.randn(3, 4), b=torch.randn(3, 4), device=device
@@ -4265,44 +4067,19 @@ def test_flatten_unflatten_key_collision(inplace, separator):
     ):
         _ = td3.flatten_keys(separator)
 
-    with pytest.raises(
-        KeyError,
-        match=re.escape(
-            "Unflattening key(s) in tensordict will override existing unflattened key"
-        ),
-    ):
+    with pytest.raises(KeyError, match=_ERR_UNFLATTEN):
         _ = td1.unflatten_keys(separator)
 
-    with pytest.raises(
-        KeyError,
-        match=re.escape(
-            "Unflattening key(s) in tensordict will override existing unflattened key"
-        ),
-    ):
+    with pytest.raises(KeyError, match=_ERR_UNFLATTEN):
         _ = td2.unflatten_keys(separator)
 
-    with pytest.raises(
-        KeyError,
-        match=re.escape(
-            "Unflattening key(s) in tensordict will override existing unflattened key"
-        ),
-    ):
+    with pytest.raises(KeyError, match=_ERR_UNFLATTEN):
         _ = td3.unflatten_keys(separator)
 
-    with pytest.raises(
-        KeyError,
-        match=re.escape(
-            "Unflattening key(s) in tensordict will override existing unflattened key"
-        ),
-    ):
+    with pytest.raises(KeyError, match=_ERR_UNFLATTEN):
         _ = td4.unflatten_keys(separator)
 
-    with pytest.raises(
-        KeyError,
-        match=re.escape(
-            "Unflattening key(s) in tensordict will override existing unflattened key"
-        ),
-    ):
+    with pytest.raises(KeyError, match=_ERR_UNFLATTEN):
         _ = td5.unflatten_keys(separator)
 
     td4_flat = td4.flatten_keys(separator)
@@ -4825,20 +4602,17 @@ class TestLazyStackedTensorDict:
         td["a", "c"] = td["a", "c"] + 1
         assert (td["a", "c"] == torch.tensor([[3], [4]], device=td.device)).all()
 
-    @pytest.mark.parametrize("device", get_available_devices())
+    @pytest.mark.parametrize("device", _DEVICES)
     @pytest.mark.parametrize("stack_dim", [0, 1])
     def test_stacked_td(self, stack_dim, device):
+        key1 = torch.randn(10, 11, 12, 5, device=device)
+        key2 = torch.zeros(10, 11, 12, 50, device=device, dtype=torch.bool).bernoulli_()
         tensordicts = [
             TensorDict(
                 batch_size=[11, 12],
-                source={
-                    "key1": torch.randn(11, 12, 5, device=device),
-                    "key2": torch.zeros(
-                        11, 12, 50, device=device, dtype=torch.bool
-                    ).bernoulli_(),
-                },
+                source={"key1": key1[i], "key2": key2[i]},
             )
-            for _ in range(10)
+            for i in range(10)
         ]
 
         tensordicts0 = tensordicts[0]
@@ -4889,7 +4663,7 @@ class TestLazyStackedTensorDict:
         std5 = sub_td.unbind(1)[0]
         assert (std5.contiguous() == sub_td.contiguous().unbind(1)[0]).all()
 
-    @pytest.mark.parametrize("device", get_available_devices())
+    @pytest.mark.parametrize("device", _DEVICES)
     @pytest.mark.parametrize("stack_dim", [0, 1, 2])
     def test_stacked_indexing(self, device, stack_dim):
         tensordict = TensorDict(
@@ -4909,7 +4683,7 @@ class TestLazyStackedTensorDict:
             assert (tds[item].get("a") == tds.get("a")[item]).all()
             assert (tds[item].get("a") == tensordict[item].get("a")).all()
 
-    @pytest.mark.parametrize("device", get_available_devices())
+    @pytest.mark.parametrize("device", _DEVICES)
     def test_stack(self, device):
         torch.manual_seed(1)
         tds_list = [TensorDict(source={}, batch_size=(4, 5)) for _ in range(3)]
@@ -4926,7 +4700,7 @@ class TestLazyStackedTensorDict:
 
     @pytest.mark.parametrize("dim", range(2))
     @pytest.mark.parametrize("index", range(2))
-    @pytest.mark.parametrize("device", get_available_devices())
+    @pytest.mark.parametrize("device", _DEVICES)
     def test_lazy_stacked_insert(self, dim, index, device):
         td = TensorDict({"a": torch.zeros(4)}, [4], device=device)
         lstd = torch.stack([td] * 2, dim=dim)
@@ -4981,7 +4755,7 @@ class TestLazyStackedTensorDict:
             "random_string" in lstd  # noqa: B015
 
     @pytest.mark.parametrize("dim", range(2))
-    @pytest.mark.parametrize("device", get_available_devices())
+    @pytest.mark.parametrize("device", _DEVICES)
     def test_lazy_stacked_append(self, dim, device):
         td = TensorDict({"a": torch.zeros(4)}, [4], device=device)
         lstd = torch.stack([td] * 2, dim=dim)
@@ -5090,7 +4864,7 @@ class TestLazyStackedTensorDict:
     @pytest.mark.parametrize("stack_dim", [0, 1, 2])
     @pytest.mark.parametrize("mask_dim", [0, 1, 2])
     @pytest.mark.parametrize("single_mask_dim", [True, False])
-    @pytest.mark.parametrize("device", get_available_devices())
+    @pytest.mark.parametrize("device", _DEVICES)
     def test_lazy_mask_indexing(self, stack_dim, mask_dim, single_mask_dim, device):
         torch.manual_seed(0)
         td = TensorDict({"a": torch.zeros(9, 10, 11)}, [9, 10, 11], device=device)
@@ -5127,7 +4901,7 @@ class TestLazyStackedTensorDict:
     @pytest.mark.parametrize("stack_dim", [0, 1, 2])
     @pytest.mark.parametrize("mask_dim", [0, 1, 2])
     @pytest.mark.parametrize("single_mask_dim", [True, False])
-    @pytest.mark.parametrize("device", get_available_devices())
+    @pytest.mark.parametrize("device", _DEVICES)
     def test_lazy_mask_setitem(self, stack_dim, mask_dim, single_mask_dim, device):
         torch.manual_seed(0)
         td = TensorDict({"a": torch.zeros(9, 10, 11)}, [9, 10, 11], device=device)
@@ -5232,7 +5006,7 @@ class TestSnapshot:
         assert (td_plain == tensordict2).all()
 
 
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_memmap_as_tensor(device):
     td = TensorDict(
         {"a": torch.randn(3, 4), "b": {"c": torch.randn(3, 4)}}, [3, 4], device="cpu"
@@ -5680,7 +5454,7 @@ class TestNamedDims(TestTensorDictsBase):
         )
         assert td[0][""].names == td[""][0].names == ["d"]
 
-    @pytest.mark.parametrize("device", get_available_devices())
+    @pytest.mark.parametrize("device", _DEVICES)
     def test_to(self, device):
         td = TensorDict(
             {"": TensorDict({}, [3, 4, 1, 6])},
@@ -5797,6 +5571,8 @@ class TestNamedDims(TestTensorDictsBase):
 
 
 def _compare_tensors_identity(td0, td1):
+    if td0 is td1:
+        return True
     if isinstance(td0, LazyStackedTensorDict):
         if not isinstance(td1, LazyStackedTensorDict):
             return False
@@ -5804,8 +5580,6 @@ def _compare_tensors_identity(td0, td1):
             if not _compare_tensors_identity(_td0, _td1):
                 return False
         return True
-    if td0 is td1:
-        return True
     for key, val in td0.items():
         if is_tensor_collection(val):
             if not _compare_tensors_identity(val, td1.get(key)):
@@ -6023,9 +5797,9 @@ class TestLock:
         td1 = td0.clone()
         td = torch.stack([td0, td1])
         td.lock_()
-        with pytest.raises(RuntimeError, match=re.escape(TensorDictBase.LOCK_ERROR)):
+        with pytest.raises(RuntimeError, match=_ERR_LOCK):
             td.insert(0, td0)
-        with pytest.raises(RuntimeError, match=re.escape(TensorDictBase.LOCK_ERROR)):
+        with pytest.raises(RuntimeError, match=_ERR_LOCK):
             td.append(td0)
         td.unlock_()
         td.insert(0, td0)
@@ -6058,7 +5832,7 @@ def test_from_module(memmap, params):
 
 @pytest.mark.parametrize("batch_size", [None, [3, 4]])
 @pytest.mark.parametrize("batch_dims", [None, 1, 2])
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 def test_from_dict(batch_size, batch_dims, device):
     data = {
         "a": torch.zeros(3, 4, 5),
@@ -6094,6 +5868,79 @@ def test_from_dict(batch_size, batch_dims, device):
         assert data["d", "g"].batch_size == torch.Size(batch_size)
 
 
+@pytest.mark.parametrize("view", ["conj", "neg"])
+def test_assert_allclose_td_lazy_view(view):
+    # lazy views share the memory of their source but not its values
+    td = TensorDict({"a": torch.randn(3, dtype=torch.cfloat)}, [3])
+    if view == "conj":
+        td_view = td.apply(torch.conj)
+    else:
+        td_view = td.apply(torch._neg_view)
+    assert td_view["a"].data_ptr() == td["a"].data_ptr()
+    assert assert_allclose_td(td, td)
+    with pytest.raises(AssertionError):
+        assert_allclose_td(td, td_view)
+
+
+@pytest.mark.skipif(torch.cuda.device_count() == 0, reason="No cuda device detected")
+def test_stage_cuda_leaves_budget():
+    tensors = {
+        "a": torch.randn(1024, device="cuda"),
+        "b": torch.randn(4096, device="cuda"),
+        "c": torch.randn(256, device="cuda"),
+    }
+    # "b" does not fit in what "a" leaves of the budget, "c" still does
+    staged = _stage_cuda_leaves(tensors, budget=8 * 1024)
+    assert set(staged) == {"a", "c"}
+    for key, (host_value, event) in staged.items():
+        event.synchronize()
+        assert host_value.is_pinned()
+        assert (host_value == tensors[key].cpu()).all()
+    # memmap_ copies the leaves left out of the staging on its own
+    td = TensorDict(tensors, []).clone()
+    td.memmap_()
+    for key, value in tensors.items():
+        assert (td[key].as_tensor() == value).all()
+
+
+@pytest.mark.skipif(torch.cuda.device_count() == 0, reason="No cuda device detected")
+def test_pin_memory():
+    td = TensorDict(
+        {
+            "a": torch.randn(3, 4),
+            "b": torch.randint(10, (3, 2)),
+            "nested": {"c": torch.randn(3)},
+        },
+        [3],
+    )
+    td_pinned = td.pin_memory()
+    assert_allclose_td(td, td_pinned)
+    assert all(value.is_pinned() for value in td_pinned.values(True, True))
+    # each leaf owns its pinned storage
+    assert (
+        td_pinned["a"].untyped_storage().data_ptr()
+        != td_pinned["nested", "c"].untyped_storage().data_ptr()
+    )
+
+
+@pytest.mark.parametrize("device", _DEVICES)
+def test_apply_foreach(device):
+    td = TensorDict(
+        {"a": torch.randn(3, 4), "nested": {"b": torch.randint(10, (3, 4, 2))}},
+        batch_size=[3, 4],
+        device=device,
+    )
+    td_neg = td.apply(torch.neg)
+    assert_allclose_td(td_neg, td.apply(lambda x: -x))
+    td_sum = td.apply(torch.add, td_neg)
+    assert (td_sum == 0).all()
+    assert td_sum["nested", "b"].dtype == torch.int64
+    assert td_sum["nested"].batch_size == td.batch_size
+    assert td_sum.device == td.device
+    with pytest.raises(KeyError):
+        td.apply(torch.add, td.exclude(("nested", "b")))
+
+
 def test_unbind_batchsize():
     td = TensorDict({"a": TensorDict({"b": torch.zeros(2, 3)}, [2, 3])}, [2])
     td["a"].batch_size
@@ -6191,7 +6038,7 @@ def test_dense_stack_tds(stack_dim, nested_stack_dim):
         ),
     ],
 )
-@pytest.mark.parametrize("device", get_available_devices())
+@pytest.mark.parametrize("device", _DEVICES)
 class TestTensorDictMP(TestTensorDictsBase):
     @staticmethod
     def add1(x):
@@ -6304,7 +6151,7 @@ class TestFCD(TestTensorDictsBase):
             ),
         ],
     )
-    @pytest.mark.parametrize("device", get_available_devices())
+    @pytest.mark.parametrize("device", _DEVICES)
     def test_fcd(self, td_name, device):
         td = getattr(self, td_name)(device)
         d0 = ftdim.dims(1)
@@ -6356,7 +6203,7 @@ class TestFCD(TestTensorDictsBase):
             # "permute_td",
         ],
     )
-    @pytest.mark.parametrize("device", get_available_devices())
+    @pytest.mark.parametrize("device", _DEVICES)
     def test_fcd_names(self, td_name, device):
         td = getattr(self, td_name)(device)
         td.names = ["a", "b", "c", "d"]